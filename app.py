@@ -1,28 +1,28 @@
 import cv2
 import time
 import os
+import functools
 import numpy as np
-from flask import Flask, render_template, Response, request, jsonify
+from flask import Flask, render_template, Response, request, jsonify, abort
 from werkzeug.utils import secure_filename
 import pose_logic
 import database
+import sessions
+import imaging
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+app.config['RENDER_MAX_WIDTH'] = 1920  # Largest annotated view /annotated will produce
+# /session/default/... is served directly instead of redirecting to the short routes
+app.url_map.redirect_defaults = False
 
 # Ensure directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 database.init_db()
 
-# Global State
+# Global State (references are shared by every session)
 state = {
-    'current_movement': 'Sikap Siap', # Target for verification
-    'detected_movement': 'None',
-    'scores': {
-        'Sikap Siap': 0.0,
-        'Serangan Dasar': 0.0
-    },
     'references': {
         'Sikap Siap': [],
         'Serangan Dasar': []
@@ -31,201 +31,198 @@ state = {
         'Sikap Siap': [],
         'Serangan Dasar': []
     },
-    'verification': {
-        'start_time': None,
-        'verified': False,
-        'last_status': 'Waiting...',
-        'progress': 0
-    }
+    'ref_signature': None, # references_table marker at last load
+    'ref_checked_at': 0.0
 }
 
-# Video Capture Global
-camera = None
+# Named training sessions, each with its own video source and verification state.
+# All of them share the references above and one pool of pose models.
+session_config, inference_workers, allowed_sources = sessions.load_session_config()
+session_manager = sessions.SessionManager(state['references'], state['ref_filenames'],
+                                          app.config['UPLOAD_FOLDER'], pool_size=inference_workers)
+for name, cfg in session_config.items():
+    session_manager.create(name, cfg.get('source'), cfg.get('max_fps', sessions.DEFAULT_MAX_FPS))
+
+def get_session(name):
+    session = session_manager.get(name)
+    if session is None:
+        abort(404, description=f"Unknown session '{name}'")
+    return session
 
 def load_references_from_db():
     print("Loading references from DB...")
+    state['ref_signature'] = database.get_references_signature()
     for mov in ['Sikap Siap', 'Serangan Dasar']:
         refs = database.get_references(mov)
-        embeddings = []
+        keypoints = []
         filenames = []
         for ref in refs:
-            path = os.path.join(app.config['UPLOAD_FOLDER'], ref['filepath_orig'])
-            if os.path.exists(path):
-                img = cv2.imread(path)
-                if img is not None:
-                    kpts = pose_logic.extract_keypoints(img)
-                    if kpts is not None:
-                        norm_kpts = pose_logic.normalize_keypoints(kpts)
-                        embeddings.append(norm_kpts)
-                        filenames.append(ref['filepath_annotated'])
+            if ref.get('keypoints') is None:
+                # Older reference without stored keypoints: detect once and store the
+                # result, including "no pose", so it is never detected again
+                path = os.path.join(app.config['UPLOAD_FOLDER'], ref['filepath_orig'])
+                if not os.path.exists(path):
+                    continue
+                img = imaging.read_image(path)
+                if img is None:
+                    continue
+                with session_manager.pool.acquire() as pose_model:
+                    kpts = pose_logic.extract_keypoints(img, pose_model)
+                ref['keypoints'] = pose_logic.keypoints_to_json(kpts, img.shape)
+                database.set_reference_keypoints(ref['id'], ref['keypoints'])
+            kpts, _ = pose_logic.keypoints_from_json(ref['keypoints'])
+            if kpts is None:
+                continue
+            keypoints.append(kpts)
+            filenames.append(ref['filepath_orig'])
+        # Normalize all references of this movement in one call
+        embeddings = []
+        if keypoints:
+            embeddings = list(pose_logic.normalize_keypoints_batch(np.stack(keypoints))[0])
         state['references'][mov] = embeddings
         state['ref_filenames'][mov] = filenames
     print(f"Loaded {len(state['references']['Sikap Siap'])} Sikap Siap, {len(state['references']['Serangan Dasar'])} Serangan Dasar")
 
+def refresh_references_if_changed():
+    """
+    Reload references changed by another process (pre-fork workers).
+    Checked at most once per second.
+    """
+    now = time.time()
+    if now - state['ref_checked_at'] < 1.0:
+        return
+    state['ref_checked_at'] = now
+    if database.get_references_signature() != state['ref_signature']:
+        load_references_from_db()
+
 # Initialize references on startup
 load_references_from_db()
+session_manager.refresh_references = refresh_references_if_changed
 
-def get_camera():
-    global camera
-    if camera is None or not camera.isOpened():
-        # Try indices 0, 1, 2
-        for idx in range(3):
-            print(f"Trying to open camera index {idx}...")
-            cap = cv2.VideoCapture(idx)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret:
-                    print(f"Camera found at index {idx}")
-                    camera = cap
-                    return camera
-                else:
-                    cap.release()
-        print("Error: No working camera found on indices 0-2.")
-        return None
-    return camera
-
-def generate_frames():
-    global camera
-    
-    while True:
-        cam = get_camera()
-        if cam is None:
-            # Yield a blank frame or error image if no camera found
-            # Create a black image with error text
-            blank_image = np.zeros((480, 640, 3), np.uint8)
-            cv2.putText(blank_image, "CAMERA NOT FOUND", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            ret, buffer = cv2.imencode('.jpg', blank_image)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            time.sleep(2) # Wait before retrying
-            continue
-
-        success, frame = cam.read()
-        if not success:
-            print("Failed to read frame. Releasing camera.")
-            cam.release()
-            camera = None # Force re-discovery
-            continue
-            
-        # Resize for performance
-        frame = cv2.resize(frame, (640, 480))
-        
-        # Single inference per frame
-        annotated_frame, live_embedding, _ = pose_logic.get_skeleton_and_embedding(frame)
-        
-        # Multi-movement logic
-        max_total_score = 0.0
-        detected_mov = "None"
-        
-        # Check all movements for classification using the same live_embedding
-        scores_map = {}
-        for mov_name in ['Sikap Siap', 'Serangan Dasar']:
-            refs = state['references'].get(mov_name, [])
-            # Use the optimized direct check
-            _, score, _ = pose_logic.check_pose_direct(live_embedding, refs, threshold=0.0)
-            state['scores'][mov_name] = float(score)
-            scores_map[mov_name] = score
-            
-            if score > max_total_score:
-                max_total_score = score
-                detected_mov = mov_name
-
-        # Confidence threshold for labeling
-        if max_total_score < 0.6: 
-            state['detected_movement'] = "Neutral / Unknown"
-        else:
-            state['detected_movement'] = detected_mov
-        
-        # Verification Logic (focused on 'current_movement')
-        target_mov = state['current_movement']
-        target_refs = state['references'].get(target_mov, [])
-        target_ref_files = state['ref_filenames'].get(target_mov, [])
-        
-        # Re-check for target with the same embedding but with threshold and best index
-        is_match, score, best_idx = pose_logic.check_pose_direct(live_embedding, target_refs, threshold=None)
-        
-        # Competitive check: Target must also be the best match
-        is_match = is_match and (detected_mov == target_mov)
-        
-        # 5-second rule logic
-        if is_match:
-            if state['verification']['start_time'] is None:
-                state['verification']['start_time'] = time.time()
-                print(f"Match found for {target_mov} ({score:.2f}). Starting timer...")
-            
-            elapsed = time.time() - state['verification']['start_time']
-            state['verification']['progress'] = min(100, (elapsed / 5.0) * 100)
-            state['verification']['last_status'] = f"Holding {target_mov}... {elapsed:.1f}s"
-            
-            if elapsed >= 5.0 and not state['verification']['verified']:
-                state['verification']['verified'] = True
-                state['verification']['last_status'] = "VERIFIED!"
-                # Save to history
-                filename = f"verified_{int(time.time())}.jpg"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                cv2.imwrite(filepath, annotated_frame)
-                
-                # Best match filename
-                best_ref = target_ref_files[best_idx] if best_idx != -1 and best_idx < len(target_ref_files) else ""
-                database.add_record(target_mov, "Correct", filename, best_ref, float(score))
-                print(f"VERIFIED: {target_mov} saved to history")
-                
-            # Draw Progress Bar and Info on Frame
-            cv2.rectangle(annotated_frame, (50, 400), (int(50 + 5.4 * state['verification']['progress']), 430), (0, 255, 0), -1)
-            cv2.putText(annotated_frame, f"Match: {score:.2f} ({target_mov})", (50, 450), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-        else:
-            state['verification']['start_time'] = None
-            state['verification']['progress'] = 0
-            state['verification']['verified'] = False
-            state['verification']['last_status'] = f"Incorrect Pose (Need {target_mov})"
-            cv2.putText(annotated_frame, f"Wait: {target_mov} ({score:.2f})", (50, 450), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-
-        # Draw Detection Label
-        cv2.putText(annotated_frame, f"Detected: {state['detected_movement']}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
-
-        # Encode
-        ret, buffer = cv2.imencode('.jpg', annotated_frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+@app.before_request
+def sync_references():
+    refresh_references_if_changed()
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    session = get_session(request.args.get('session', sessions.DEFAULT_SESSION))
+    return render_template('index.html', session_name=session.name)
 
 @app.route('/history_page')
 def history_page():
     return render_template('history.html')
 
-@app.route('/video_feed')
-def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
-
-@app.route('/status')
-def get_status():
-    return jsonify({
-        'movement': state['current_movement'],
-        'detected': state['detected_movement'],
-        'scores': state['scores'],
-        'status': state['verification']['last_status'],
-        'progress': state['verification']['progress'],
-        'verified': state['verification']['verified'],
-        'ref_counts': {
-            'Sikap Siap': len(state['references']['Sikap Siap']),
-            'Serangan Dasar': len(state['references']['Serangan Dasar'])
-        }
-    })
-
-@app.route('/set_movement', methods=['POST'])
-def set_movement():
+@app.route('/video_feed', defaults={'name': sessions.DEFAULT_SESSION})
+@app.route('/session/<name>/video_feed')
+def video_feed(name):
+    session = get_session(name)
+    return Response(session.generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/status', defaults={'name': sessions.DEFAULT_SESSION})
+@app.route('/session/<name>/status')
+def get_status(name):
+    return jsonify(get_session(name).status())
+
+@app.route('/set_movement', methods=['POST'], defaults={'name': sessions.DEFAULT_SESSION})
+@app.route('/session/<name>/set_movement', methods=['POST'])
+def set_movement(name):
     data = request.json
-    state['current_movement'] = data['movement']
-    # Reset verification state
-    state['verification'] = {'start_time': None, 'verified': False, 'last_status': 'Waiting...', 'progress': 0}
+    get_session(name).set_movement(data['movement'])
+    return jsonify({'success': True})
+
+@app.route('/sessions', methods=['GET', 'POST'])
+def sessions_route():
+    if request.method == 'GET':
+        return jsonify(session_manager.list())
+    if session_manager.shared_dir:
+        return jsonify({'success': False, 'error': 'Sessions are fixed by config.json when serving with several workers'}), 400
+    data = request.json or {}
+    name = data.get('name')
+    if not name:
+        return jsonify({'success': False, 'error': 'Session name missing'}), 400
+    # Only camera indices or sources listed in config.json, never arbitrary files/URLs
+    source = data.get('source')
+    if source is not None and type(source) not in (int, str):
+        return jsonify({'success': False, 'error': 'Source must be a camera index or a string'}), 400
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if source is not None and not (type(source) is int and source >= 0) and source not in allowed_sources:
+        return jsonify({'success': False, 'error': 'Source must be a camera index or listed in config.json "allowed_sources"'}), 400
+    try:
+        max_fps = float(data.get('max_fps', sessions.DEFAULT_MAX_FPS))
+    except (TypeError, ValueError):
+        max_fps = 0.0
+    if not 0 < max_fps <= 120:
+        return jsonify({'success': False, 'error': 'max_fps must be a positive number (at most 120)'}), 400
+    try:
+        session = session_manager.create(name, source, max_fps)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    return jsonify({'success': True, 'session': session.info()})
+
+@app.route('/delete_session', methods=['POST'])
+def delete_session_route():
+    if session_manager.shared_dir:
+        return jsonify({'success': False, 'error': 'Sessions are fixed by config.json when serving with several workers'}), 400
+    name = request.json.get('name')
+    if name == sessions.DEFAULT_SESSION:
+        return jsonify({'success': False, 'error': 'The default session cannot be deleted'}), 400
+    if session_manager.remove(name) is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
     return jsonify({'success': True})
 
+def without_keypoints(row):
+    # Keypoints are only needed server-side for rendering
+    return {k: v for k, v in row.items() if k != 'keypoints'}
+
+def annotated_url(filename):
+    return f"/annotated/{filename}"
+
+@functools.lru_cache(maxsize=1024)
+def source_width(filename, mtime):
+    return imaging.read_image_width(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+
+@functools.lru_cache(maxsize=256)
+def render_annotated(filename, width, mtime):
+    """
+    JPEG of an uploaded image at the given width (at most its own) with its stored
+    skeleton drawn on.
+    mtime is part of the cache key so a replaced file is re-rendered.
+    Images without stored keypoints (older annotated/result files) are only resized.
+    """
+    img = imaging.read_image(os.path.join(app.config['UPLOAD_FOLDER'], filename), target_width=width)
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    if w > width:
+        img = cv2.resize(img, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+
+    kpts, source_size = pose_logic.keypoints_from_json(database.get_image_keypoints(filename))
+    if kpts is not None:
+        # Keypoints were detected on a differently sized decode of the same image
+        kpts = kpts.copy()
+        kpts[:, 0] *= img.shape[1] / source_size[1]
+        kpts[:, 1] *= img.shape[0] / source_size[0]
+        pose_logic.draw_skeleton(img, kpts)
+    return imaging.encode_jpeg(img)
+
+@app.route('/annotated/<filename>')
+def annotated_image(filename):
+    filename = secure_filename(filename)
+    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not filename or not os.path.isfile(path):
+        abort(404)
+    width = min(max(request.args.get('w', 640, type=int), 32), app.config['RENDER_MAX_WIDTH'])
+    # Never upscale (e.g. 640 px camera frames viewed in the 1280 px modal)
+    width = min(width, source_width(filename, os.path.getmtime(path)) or width)
+    data = render_annotated(filename, width, os.path.getmtime(path))
+    if data is None:
+        abort(404)
+    response = Response(data, mimetype='image/jpeg')
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response
+
 @app.route('/upload_references', methods=['POST'])
 def upload_references():
     try:
@@ -242,23 +239,23 @@ def upload_references():
             if file and file.filename:
                 filename = secure_filename(f"ref_{int(time.time())}_{file.filename}")
                 filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
+                data = file.read()
                 
-                # Process & Annotate
-                img = cv2.imread(filepath)
+                # Decode from memory at model size
+                img = imaging.decode_image(data)
                 if img is None: 
                     print(f"Warning: Could not read uploaded image {filename}")
                     continue
                 
-                # Get skeleton
-                annotated_img, _, _ = pose_logic.get_skeleton_and_embedding(img)
-                
-                annotated_filename = f"annotated_{filename}"
-                annotated_path = os.path.join(app.config['UPLOAD_FOLDER'], annotated_filename)
-                cv2.imwrite(annotated_path, annotated_img)
+                # Keep the original, annotated views are rendered from it
+                with open(filepath, 'wb') as f:
+                    f.write(data)
                 
-                # Save to DB
-                database.add_reference(movement, filename, annotated_filename)
+                # Get skeleton
+                with session_manager.pool.acquire() as pose_model:
+                    _, kpts = pose_logic.get_keypoints_and_embedding(img, pose_model)
+                # Save to DB ("no pose" is stored too, so it is not detected again on load)
+                database.add_reference(movement, filename, "", pose_logic.keypoints_to_json(kpts, img.shape))
                 count += 1
         
         # Reload references to update state
@@ -272,19 +269,20 @@ def upload_references():
 def api_get_references():
     movement = request.args.get('movement')
     refs = database.get_references(movement)
-    return jsonify(refs)
+    return jsonify([without_keypoints(ref) for ref in refs])
 
 @app.route('/delete_reference', methods=['POST'])
 def delete_reference_route():
     ref_id = request.json.get('id')
     deleted = database.delete_reference(ref_id)
     if deleted:
-        # Optimistically remove files (ignore errors)
-        try:
-            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], deleted['filepath_orig']))
-            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], deleted['filepath_annotated']))
-        except:
-            pass
+        # Optimistically remove files (ignore errors); newer references have no annotated copy
+        for filename in (deleted['filepath_orig'], deleted['filepath_annotated']):
+            if filename:
+                try:
+                    os.remove(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                except OSError:
+                    pass
         # Reload state
         load_references_from_db()
         return jsonify({'success': True})
@@ -297,93 +295,96 @@ def verify_image():
             return jsonify({'error': 'No file part'}), 400
         file = request.files['file']
         
-        movement_type = request.form.get('movement', state['current_movement'])
+        session = session_manager.get(request.form.get('session', sessions.DEFAULT_SESSION))
+        movement_type = request.form.get('movement', session.current_movement if session else sessions.MOVEMENTS[0])
         
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
             
-        filename = secure_filename(f"test_{int(time.time())}_{file.filename}")
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        data = file.read()
         
-        img = cv2.imread(filepath)
+        # Decode from memory at model size
+        img = imaging.decode_image(data)
         if img is None:
             return jsonify({'error': 'Failed to read image (invalid format?)'}), 400
-
+        
         refs = state['references'].get(movement_type, [])
         ref_files = state['ref_filenames'].get(movement_type, [])
         
         # Use efficient logic
-        annotated, embedding, _ = pose_logic.get_skeleton_and_embedding(img)
+        with session_manager.pool.acquire() as pose_model:
+            embedding, kpts = pose_logic.get_keypoints_and_embedding(img, pose_model)
         
         if embedding is None:
             # No person detected
-            res_filename = f"no_pose_{int(time.time())}.jpg"
-            cv2.imwrite(os.path.join(app.config['UPLOAD_FOLDER'], res_filename), img)
             return jsonify({
                 'match': False,
                 'score': 0.0,
-                'error': 'No person or pose detected in image',
-                'image_url': f"/static/uploads/{res_filename}"
+                'error': 'No person or pose detected in image'
             })
 
         is_match, score, best_idx = pose_logic.check_pose_direct(embedding, refs, threshold=None)
         
-        # Save result image
-        res_filename = f"result_{int(time.time())}.jpg"
-        res_path = os.path.join(app.config['UPLOAD_FOLDER'], res_filename)
-        cv2.imwrite(res_path, annotated)
-        
         result_text = "Correct" if is_match else "Incorrect"
         best_ref = ref_files[best_idx] if best_idx != -1 and best_idx < len(ref_files) else ""
         
-        database.add_record(movement_type, result_text, res_filename, best_ref, float(score))
+        # Only uploads that get a history record are kept; the original is the
+        # history image and its skeleton is drawn on request
+        res_filename = secure_filename(f"test_{int(time.time())}_{file.filename}")
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], res_filename), 'wb') as f:
+            f.write(data)
+        
+        database.add_record(movement_type, result_text, res_filename, best_ref, float(score),
+                            pose_logic.keypoints_to_json(kpts, img.shape))
         
         return jsonify({
             'match': is_match,
             'score': float(score),
-            'image_url': f"/static/uploads/{res_filename}",
-            'best_ref': f"/static/uploads/{best_ref}" if best_ref else None
+            'image_url': annotated_url(res_filename),
+            'best_ref': annotated_url(best_ref) if best_ref else None
         })
     except Exception as e:
         print(f"Error in verify_image: {e}")
         return jsonify({'error': 'Internal server error during processing'}), 500
 
-@app.route('/verify_instant', methods=['POST'])
-def verify_instant():
+@app.route('/verify_instant', methods=['POST'], defaults={'name': sessions.DEFAULT_SESSION})
+@app.route('/session/<name>/verify_instant', methods=['POST'])
+def verify_instant(name):
+    session = get_session(name)
     try:
-        cam = get_camera()
-        success, frame = cam.read()
-        if not success:
+        frame = session.capture_frame()
+        if frame is None:
             return jsonify({'error': 'Failed to capture frame from camera'}), 500
             
-        current_mov = state['current_movement']
+        current_mov = session.current_movement
         refs = state['references'].get(current_mov, [])
         ref_files = state['ref_filenames'].get(current_mov, [])
         
         # Consistent with live logic
-        annotated, embedding, _ = pose_logic.get_skeleton_and_embedding(frame)
+        with session_manager.pool.acquire() as pose_model:
+            embedding, kpts = pose_logic.get_keypoints_and_embedding(frame, pose_model)
         
         if embedding is None:
             return jsonify({'match': False, 'score': 0.0, 'error': 'No person detected'})
 
         is_match, score, best_idx = pose_logic.check_pose_direct(embedding, refs, threshold=None)
         
-        # Save result image
-        res_filename = f"instant_{int(time.time())}.jpg"
+        # Save the plain frame, the skeleton is drawn on request
+        res_filename = f"instant_{session.name}_{int(time.time())}.jpg"
         res_path = os.path.join(app.config['UPLOAD_FOLDER'], res_filename)
-        cv2.imwrite(res_path, annotated)
+        cv2.imwrite(res_path, frame)
         
         result_text = "Correct" if is_match else "Incorrect"
         best_ref = ref_files[best_idx] if best_idx != -1 and best_idx < len(ref_files) else ""
         
-        database.add_record(current_mov, result_text, res_filename, best_ref, float(score))
+        database.add_record(current_mov, result_text, res_filename, best_ref, float(score),
+                            pose_logic.keypoints_to_json(kpts, frame.shape))
         
         return jsonify({
             'match': is_match,
             'score': float(score),
-            'image_url': f"/static/uploads/{res_filename}",
-            'best_ref': f"/static/uploads/{best_ref}" if best_ref else None
+            'image_url': annotated_url(res_filename),
+            'best_ref': annotated_url(best_ref) if best_ref else None
         })
     except Exception as e:
         print(f"Error in verify_instant: {e}")
@@ -393,7 +394,13 @@ def verify_instant():
 @app.route('/history')
 def history():
     records = database.get_history()
-    return jsonify(records)
+    return jsonify([without_keypoints(record) for record in records])
+
+@app.route('/history/stats')
+def history_stats():
+    # Served from the summary tables, cost does not grow with history size
+    stats = database.get_history_stats(request.args.get('start'), request.args.get('end'))
+    return jsonify(stats)
 
 @app.route('/delete_history_item', methods=['POST'])
 def delete_history_item_route():
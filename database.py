@@ -39,16 +39,190 @@ def init_db():
         conn.commit()
     except sqlite3.OperationalError:
         pass # Column already exists
+
+    # Migration: detected keypoints (JSON), annotated views are rendered from them
+    for table in ("history", "references_table"):
+        try:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN keypoints TEXT")
+            conn.commit()
+        except sqlite3.OperationalError:
+            pass # Column already exists
+    c.execute("CREATE INDEX IF NOT EXISTS idx_history_image ON history (image_path)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_references_orig ON references_table (filepath_orig)")
+    conn.commit()
+
+    # Summary tables, kept up to date by add_record / delete_history_item / clear_history
+    c.execute('''CREATE TABLE IF NOT EXISTS history_stats
+                 (day TEXT,
+                  movement_type TEXT,
+                  total INTEGER DEFAULT 0,
+                  correct INTEGER DEFAULT 0,
+                  incorrect INTEGER DEFAULT 0,
+                  score_sum REAL DEFAULT 0,
+                  PRIMARY KEY (day, movement_type))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS history_score_hist
+                 (day TEXT,
+                  movement_type TEXT,
+                  bucket INTEGER,
+                  count INTEGER DEFAULT 0,
+                  PRIMARY KEY (day, movement_type, bucket))''')
+    conn.commit()
+
+    # Migration: build summaries for databases created before they existed
+    c.execute("SELECT EXISTS(SELECT 1 FROM history), EXISTS(SELECT 1 FROM history_stats)")
+    has_history, has_stats = c.fetchone()
+    if has_history and not has_stats:
+        _rebuild_stats(c)
+        conn.commit()
         
     conn.close()
 
+# --- History Statistics ---
+SCORE_BUCKETS = 10 # Histogram of scores in steps of 0.1
+
+def _score_bucket(score):
+    return min(max(int((score or 0.0) * SCORE_BUCKETS), 0), SCORE_BUCKETS - 1)
+
+def _apply_stats(c, timestamp, movement_type, result, score, sign):
+    """
+    Add (sign=1) or remove (sign=-1) one history row from the summary tables.
+    """
+    day = (timestamp or "")[:10]
+    correct = 1 if result == "Correct" else 0
+    incorrect = 1 if result == "Incorrect" else 0
+    c.execute('''INSERT INTO history_stats (day, movement_type, total, correct, incorrect, score_sum)
+                 VALUES (?, ?, ?, ?, ?, ?)
+                 ON CONFLICT(day, movement_type) DO UPDATE SET
+                  total = total + excluded.total,
+                  correct = correct + excluded.correct,
+                  incorrect = incorrect + excluded.incorrect,
+                  score_sum = score_sum + excluded.score_sum''',
+              (day, movement_type, sign, sign * correct, sign * incorrect, sign * (score or 0.0)))
+    c.execute('''INSERT INTO history_score_hist (day, movement_type, bucket, count)
+                 VALUES (?, ?, ?, ?)
+                 ON CONFLICT(day, movement_type, bucket) DO UPDATE SET count = count + excluded.count''',
+              (day, movement_type, _score_bucket(score), sign))
+    if sign < 0:
+        # Only the rows just updated can have dropped to zero
+        c.execute("DELETE FROM history_stats WHERE day=? AND movement_type=? AND total <= 0",
+                  (day, movement_type))
+        c.execute("DELETE FROM history_score_hist WHERE day=? AND movement_type=? AND bucket=? AND count <= 0",
+                  (day, movement_type, _score_bucket(score)))
+
+def _rebuild_stats(c):
+    c.execute("DELETE FROM history_stats")
+    c.execute("DELETE FROM history_score_hist")
+    c.execute('''INSERT INTO history_stats (day, movement_type, total, correct, incorrect, score_sum)
+                 SELECT substr(timestamp, 1, 10), movement_type, COUNT(*),
+                        SUM(result = 'Correct'), SUM(result = 'Incorrect'), TOTAL(score)
+                 FROM history GROUP BY 1, 2''')
+    c.execute('''INSERT INTO history_score_hist (day, movement_type, bucket, count)
+                 SELECT substr(timestamp, 1, 10), movement_type,
+                        MIN(MAX(CAST(COALESCE(score, 0) * ? AS INTEGER), 0), ?), COUNT(*)
+                 FROM history GROUP BY 1, 2, 3''', (SCORE_BUCKETS, SCORE_BUCKETS - 1))
+
+def rebuild_history_stats():
+    """
+    Recompute the summary tables from the full history table.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    _rebuild_stats(c)
+    conn.commit()
+    conn.close()
+
+def _read_stats(c):
+    c.execute("SELECT day, movement_type, total, correct, incorrect, score_sum FROM history_stats")
+    stats = {(row[0], row[1]): list(row[2:]) for row in c.fetchall()}
+    c.execute("SELECT day, movement_type, bucket, count FROM history_score_hist")
+    hist = {(row[0], row[1], row[2]): row[3] for row in c.fetchall()}
+    return stats, hist
+
+def check_history_stats():
+    """
+    Compare the summary tables against a fresh aggregate of history.
+    Returns a list of mismatch descriptions (empty when consistent).
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    current = _read_stats(c)
+    # Rebuild into the real tables inside a transaction and roll it back
+    _rebuild_stats(c)
+    expected = _read_stats(c)
+    conn.rollback()
+    conn.close()
+
+    problems = []
+    for name, have, want in (("stats", current[0], expected[0]), ("histogram", current[1], expected[1])):
+        for key in sorted(set(have) | set(want), key=str):
+            a, b = have.get(key), want.get(key)
+            if a is None or b is None:
+                problems.append(f"{name} {key}: summary={a} expected={b}")
+            elif isinstance(a, list):
+                if a[:3] != b[:3] or abs(a[3] - b[3]) > 1e-6:
+                    problems.append(f"{name} {key}: summary={a} expected={b}")
+            elif a != b:
+                problems.append(f"{name} {key}: summary={a} expected={b}")
+    return problems
+
+def get_history_stats(start_day=None, end_day=None):
+    """
+    Pass rate, average score and score histogram per movement (and per day),
+    read from the summary tables only.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    where = "WHERE day >= ? AND day <= ?"
+    params = (start_day or "0000-00-00", end_day or "9999-99-99")
+    # One read transaction, so counts and histograms come from the same snapshot
+    c.execute("BEGIN")
+    c.execute(f"SELECT * FROM history_stats {where} ORDER BY day", params)
+    stats_rows = c.fetchall()
+    c.execute(f"SELECT * FROM history_score_hist {where}", params)
+    hist_rows = c.fetchall()
+    conn.commit()
+    conn.close()
+
+    def empty():
+        return {'total': 0, 'correct': 0, 'incorrect': 0, 'score_sum': 0.0, 'histogram': [0] * SCORE_BUCKETS}
+
+    def finish(entry):
+        total = entry['total']
+        score_sum = entry.pop('score_sum')
+        entry['pass_rate'] = entry['correct'] / total if total else 0.0
+        entry['avg_score'] = score_sum / total if total else 0.0
+        return entry
+
+    overall = empty()
+    movements = {}
+    days = {}
+    for row in stats_rows:
+        targets = (overall, movements.setdefault(row['movement_type'], empty()),
+                   days.setdefault(row['day'], {}).setdefault(row['movement_type'], empty()))
+        for entry in targets:
+            for key in ('total', 'correct', 'incorrect', 'score_sum'):
+                entry[key] += row[key]
+    for row in hist_rows:
+        day_entry = days.get(row['day'], {}).get(row['movement_type'])
+        for entry in (overall, movements.get(row['movement_type']), day_entry):
+            if entry is not None:
+                entry['histogram'][row['bucket']] += row['count']
+
+    return {
+        'overall': finish(overall),
+        'movements': {mov: finish(entry) for mov, entry in movements.items()},
+        'days': {day: {mov: finish(entry) for mov, entry in movs.items()} for day, movs in days.items()}
+    }
+
 # --- History Methods ---
-def add_record(movement_type, result, image_path="", ref_path="", score=0.0):
+def add_record(movement_type, result, image_path="", ref_path="", score=0.0, keypoints=None):
     conn = sqlite3.connect(DB_NAME)
     c = conn.cursor()
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO history (timestamp, movement_type, result, image_path, ref_path, score) VALUES (?, ?, ?, ?, ?, ?)",
-              (timestamp, movement_type, result, image_path, ref_path, score))
+    c.execute("INSERT INTO history (timestamp, movement_type, result, image_path, ref_path, score, keypoints) VALUES (?, ?, ?, ?, ?, ?, ?)",
+              (timestamp, movement_type, result, image_path, ref_path, score, keypoints))
+    _apply_stats(c, timestamp, movement_type, result, score, 1)
     conn.commit()
     conn.close()
 
@@ -64,27 +238,56 @@ def get_history():
 def delete_history_item(item_id):
     conn = sqlite3.connect(DB_NAME)
     c = conn.cursor()
-    c.execute("DELETE FROM history WHERE id=?", (item_id,))
-    conn.commit()
+    c.execute("SELECT timestamp, movement_type, result, score FROM history WHERE id=?", (item_id,))
+    row = c.fetchone()
+    if row:
+        c.execute("DELETE FROM history WHERE id=?", (item_id,))
+        # A concurrent delete of the same row may have won, count it only once
+        if c.rowcount == 1:
+            _apply_stats(c, row[0], row[1], row[2], row[3], -1)
+        conn.commit()
     conn.close()
 
 def clear_history():
     conn = sqlite3.connect(DB_NAME)
     c = conn.cursor()
     c.execute("DELETE FROM history")
+    c.execute("DELETE FROM history_stats")
+    c.execute("DELETE FROM history_score_hist")
     conn.commit()
     conn.close()
 
 # --- Reference Methods ---
-def add_reference(movement_type, filepath_orig, filepath_annotated):
+def add_reference(movement_type, filepath_orig, filepath_annotated="", keypoints=None):
     conn = sqlite3.connect(DB_NAME)
     c = conn.cursor()
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO references_table (movement_type, filepath_orig, filepath_annotated, timestamp) VALUES (?, ?, ?, ?)",
-              (movement_type, filepath_orig, filepath_annotated, timestamp))
+    c.execute("INSERT INTO references_table (movement_type, filepath_orig, filepath_annotated, timestamp, keypoints) VALUES (?, ?, ?, ?, ?)",
+              (movement_type, filepath_orig, filepath_annotated, timestamp, keypoints))
+    conn.commit()
+    conn.close()
+
+def set_reference_keypoints(ref_id, keypoints):
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("UPDATE references_table SET keypoints=? WHERE id=?", (keypoints, ref_id))
     conn.commit()
     conn.close()
 
+def get_image_keypoints(filename):
+    """
+    Stored keypoints JSON for a reference or history image, or None.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT keypoints FROM references_table WHERE filepath_orig=? AND keypoints IS NOT NULL", (filename,))
+    row = c.fetchone()
+    if row is None:
+        c.execute("SELECT keypoints FROM history WHERE image_path=? AND keypoints IS NOT NULL", (filename,))
+        row = c.fetchone()
+    conn.close()
+    return row[0] if row else None
+
 def get_references(movement_type=None):
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
@@ -97,6 +300,17 @@ def get_references(movement_type=None):
     conn.close()
     return [dict(row) for row in rows]
 
+def get_references_signature():
+    """
+    Cheap change marker for references_table (ids are never reused).
+    """
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM references_table")
+    row = c.fetchone()
+    conn.close()
+    return tuple(row)
+
 def delete_reference(ref_id):
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
@@ -109,3 +323,20 @@ def delete_reference(ref_id):
         conn.commit()
     conn.close()
     return dict(row) if row else None
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="History database maintenance.")
+    parser.add_argument("command", choices=["rebuild-stats", "check-stats"])
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "rebuild-stats":
+        rebuild_history_stats()
+        print("History statistics rebuilt.")
+    else:
+        problems = check_history_stats()
+        for problem in problems:
+            print(problem)
+        print("History statistics are consistent." if not problems else f"{len(problems)} mismatches found.")
+        raise SystemExit(1 if problems else 0)
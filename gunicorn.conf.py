@@ -0,0 +1,35 @@
+"""
+Pre-fork production settings (Linux/macOS):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app (YOLO model + reference embeddings) is loaded once in the master and shared
+copy-on-write by the workers. Exactly one worker owns the cameras; the others serve
+its frames and status. Values come from the "server" block of config.json and can be
+overridden with POSE_BIND, POSE_WORKERS, POSE_THREADS and POSE_INFERENCE_THREADS.
+"""
+import os
+import tempfile
+import pose_logic
+
+_server = pose_logic.load_config().get('server', {})
+
+bind = os.environ.get('POSE_BIND', _server.get('bind', '0.0.0.0:5000'))
+workers = int(os.environ.get('POSE_WORKERS', _server.get('workers', 2)))
+# Threaded workers: MJPEG streams and /status polls keep being served while
+# another thread of the same worker waits on inference
+worker_class = 'gthread'
+threads = int(os.environ.get('POSE_THREADS', _server.get('threads', 8)))
+preload_app = True
+timeout = 120
+graceful_timeout = 10
+
+# 0 = share the cores evenly between workers
+inference_threads = int(os.environ.get('POSE_INFERENCE_THREADS', _server.get('inference_threads', 0)))
+runtime_dir = _server.get('runtime_dir') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'pose-sessions')
+
+def post_fork(server, worker):
+    import app
+    pose_logic.set_inference_threads(inference_threads or max(1, (os.cpu_count() or 1) // workers))
+    app.session_manager.enable_shared_capture(runtime_dir)
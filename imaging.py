@@ -0,0 +1,78 @@
+import io
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+# YOLO letterboxes everything to this size, extra pixels are wasted work
+MODEL_INPUT_SIZE = 640
+
+REDUCED_DECODE_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4}
+
+def decode_image(data, target_size=MODEL_INPUT_SIZE, target_width=None):
+    """
+    Decode encoded image bytes (e.g. an upload) straight from memory to a BGR array.
+    JPEGs use Pillow's draft mode so the decoder only produces the smallest DCT scale
+    (1/2, 1/4, 1/8) whose long side still covers target_size (or whose width covers
+    target_width, if given). EXIF orientation is applied.
+    Returns None if the bytes are not a readable image.
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        w, h = img.size
+        if target_width:
+            # Width after EXIF rotation (orientations 5-8 swap the axes)
+            rotated = img.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+            scale = target_width / float(h if rotated else w)
+            target_size = max(w, h) * scale
+        else:
+            scale = target_size / float(max(w, h))
+        if scale < 1.0:
+            # No-op for formats without reduced-size decoding
+            img.draft('RGB', (int(w * scale), int(h * scale)))
+        img = ImageOps.exif_transpose(img)
+        # Non-JPEG sources: cheap integer box reduction to roughly target size
+        factor = int(max(img.size) // target_size)
+        if factor > 1:
+            img = img.reduce(factor)
+        rgb = np.asarray(img.convert('RGB'))
+        return np.ascontiguousarray(rgb[:, :, ::-1])
+    except Exception as e:
+        print(f"Pillow could not decode image ({e}), falling back to OpenCV")
+
+    # OpenCV cannot report the size up front: decode at 1/8 first, then again at
+    # the smallest scale that still covers the target
+    buffer = np.frombuffer(data, np.uint8)
+    img = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_COLOR_8)
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    full_size = (w if target_width else max(h, w)) * 8
+    goal = target_width or target_size
+    factor = next((f for f in (8, 4, 2) if full_size / f >= goal), 1)
+    if factor == 8:
+        return img
+    return cv2.imdecode(buffer, REDUCED_DECODE_FLAGS.get(factor, cv2.IMREAD_COLOR))
+
+def read_image(path, target_size=MODEL_INPUT_SIZE, target_width=None):
+    """
+    Read and decode an image file at reduced size (see decode_image).
+    """
+    with open(path, 'rb') as f:
+        return decode_image(f.read(), target_size, target_width)
+
+def read_image_width(path):
+    """
+    Width of an image file after EXIF rotation, read from the header only.
+    Returns None if Pillow cannot open it.
+    """
+    try:
+        with Image.open(path) as img:
+            w, h = img.size
+            rotated = img.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+            return h if rotated else w
+    except Exception:
+        return None
+
+def encode_jpeg(image, quality=90):
+    ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ret else None
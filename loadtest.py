@@ -0,0 +1,381 @@
+"""
+End-to-end load test for app.py.
+
+Starts the Flask app in-process on a temporary database/upload folder, feeds every
+session from a looping image source (images in static/uploads) and optionally swaps
+YOLO for a stub pose model so the whole run works offline. Then drives a mix of
+stream viewers, /status pollers, /verify_image uploads and /history reads and prints
+a JSON report (throughput, latency percentiles, per-client stream FPS, error rates).
+
+Example:
+    python loadtest.py --duration 30 --sessions 2 --viewers 4 --uploaders 2 --output report.json
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import urllib.error
+import uuid
+import cv2
+import numpy as np
+import pose_logic
+
+UPLOAD_DIR = os.path.join("static", "uploads")
+
+# Standing pose in a 640x480 frame, COCO keypoint order (x, y)
+BASE_POSE = np.array([
+    [320, 80], [330, 70], [310, 70], [345, 75], [295, 75],
+    [360, 130], [280, 130], [380, 200], [260, 200], [390, 260], [250, 260],
+    [350, 260], [290, 260], [355, 350], [285, 350], [360, 440], [280, 440]
+], dtype=np.float32)
+
+
+# --- Stub pose model (mimics the parts of an ultralytics Results object pose_logic uses) ---
+class StubTensor:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class StubKeypoints:
+    def __init__(self, kpts):
+        self.data = [StubTensor(kpts)]
+
+
+class StubResult:
+    def __init__(self, image, kpts):
+        self.image = image
+        self.keypoints = StubKeypoints(kpts)
+
+    def plot(self):
+        return pose_logic.draw_skeleton(self.image.copy(), self.keypoints.data[0].numpy())
+
+
+class StubPoseModel:
+    """
+    Returns one person whose pose is jittered deterministically from the image content,
+    after sleeping `latency` seconds to stand in for real inference time.
+    """
+    latency = 0.03
+
+    def __call__(self, image, verbose=False):
+        time.sleep(self.latency)
+        h, w = image.shape[:2]
+        seed = int(image[::32, ::32].sum()) % (2 ** 32)
+        rng = np.random.default_rng(seed)
+        xy = BASE_POSE * np.array([w / 640.0, h / 480.0], dtype=np.float32)
+        xy = xy + rng.normal(0, 0.04 * h, xy.shape).astype(np.float32)
+        conf = rng.uniform(0.5, 1.0, (17, 1)).astype(np.float32)
+        return [StubResult(image, np.hstack([xy, conf]))]
+
+
+# --- Fake video source ---
+class LoopingImageSource:
+    """
+    cv2.VideoCapture look-alike that endlessly cycles through a list of images
+    at a fixed camera frame rate.
+    """
+    def __init__(self, frames, fps=30.0):
+        self.frames = frames
+        self.interval = 1.0 / fps
+        self.index = random.randrange(len(frames))
+        self.next_time = time.time()
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        delay = self.next_time - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_time = max(self.next_time + self.interval, time.time())
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        return True, frame.copy()
+
+    def release(self):
+        self.opened = False
+
+
+# --- Stats ---
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {} # name -> list of (latency_s, ok)
+        self.streams = [] # per-client stream results
+
+    def add(self, name, latency, ok):
+        with self.lock:
+            self.samples.setdefault(name, []).append((latency, ok))
+
+    def add_stream(self, result):
+        with self.lock:
+            self.streams.append(result)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    return float(np.percentile(values, pct))
+
+def summarize(samples, duration):
+    latencies = [lat * 1000.0 for lat, ok in samples if ok]
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'throughput_rps': len(samples) / duration if duration else 0.0,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else None,
+            'mean': float(np.mean(latencies)) if latencies else None
+        }
+    }
+
+
+# --- HTTP helpers ---
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for name, value in fields.items():
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    for name, filename, data in files:
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n').encode()
+        body += data + b'\r\n'
+    body += f'--{boundary}--\r\n'.encode()
+    return bytes(body), f'multipart/form-data; boundary={boundary}'
+
+def timed_request(recorder, name, url, data=None, content_type=None, timeout=30):
+    req = urllib.request.Request(url, data=data)
+    if content_type:
+        req.add_header('Content-Type', content_type)
+    start = time.time()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            ok = resp.status == 200
+    except (urllib.error.URLError, OSError):
+        body, ok = None, False
+    recorder.add(name, time.time() - start, ok)
+    return body
+
+
+# --- Clients ---
+def stream_viewer(base_url, session, stop_at, recorder, client_id):
+    url = f"{base_url}/session/{session}/video_feed"
+    start = time.time()
+    frames = 0
+    first_frame = None
+    error = None
+    try:
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            while time.time() < stop_at:
+                line = resp.readline()
+                if not line:
+                    error = 'stream closed'
+                    break
+                if line.startswith(b'Content-Type: image/jpeg'):
+                    frames += 1
+                    if first_frame is None:
+                        first_frame = time.time() - start
+    except (urllib.error.URLError, OSError) as e:
+        error = str(e)
+    # Rate after the first frame, so camera start-up is not counted
+    elapsed = min(time.time(), stop_at) - start - (first_frame or 0.0)
+    recorder.add_stream({
+        'client': client_id,
+        'session': session,
+        'frames': frames,
+        'fps': (frames - 1) / elapsed if frames > 1 and elapsed > 0 else 0.0,
+        'first_frame_ms': first_frame * 1000.0 if first_frame is not None else None,
+        'error': error
+    })
+
+def status_poller(base_url, session, stop_at, recorder, interval=0.5):
+    while time.time() < stop_at:
+        timed_request(recorder, 'status', f"{base_url}/session/{session}/status")
+        time.sleep(interval)
+
+def uploader(base_url, session, stop_at, recorder, images, movements, think_time):
+    while time.time() < stop_at:
+        path = random.choice(images)
+        with open(path, 'rb') as f:
+            data = f.read()
+        body, content_type = encode_multipart(
+            {'movement': random.choice(movements), 'session': session},
+            [('file', os.path.basename(path), data)])
+        timed_request(recorder, 'verify_image', f"{base_url}/verify_image", body, content_type, timeout=60)
+        time.sleep(think_time)
+
+def history_reader(base_url, stop_at, recorder, think_time):
+    while time.time() < stop_at:
+        timed_request(recorder, 'history', f"{base_url}/history")
+        time.sleep(think_time)
+
+
+def find_images(images_dir):
+    paths = []
+    for pattern in ('*.jpg', '*.JPG', '*.jpeg', '*.png'):
+        paths.extend(glob.glob(os.path.join(images_dir, pattern)))
+    return sorted(set(paths))
+
+def load_frames(paths, limit=20):
+    frames = []
+    for path in paths[:limit]:
+        img = cv2.imread(path)
+        if img is not None:
+            frames.append(cv2.resize(img, (640, 480)))
+    return frames
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the pose verification server.")
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds of load after warm-up")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Seconds to let sessions start before measuring")
+    parser.add_argument('--sessions', type=int, default=1, help="Number of camera sessions")
+    parser.add_argument('--max-fps', type=float, default=15.0, help="Per-session frame rate cap")
+    parser.add_argument('--camera-fps', type=float, default=30.0, help="Fake camera frame rate")
+    parser.add_argument('--workers', type=int, default=1, help="Inference pool size")
+    parser.add_argument('--viewers', type=int, default=2, help="Stream viewers (spread across sessions)")
+    parser.add_argument('--pollers', type=int, default=2, help="/status pollers (spread across sessions)")
+    parser.add_argument('--uploaders', type=int, default=1, help="/verify_image clients")
+    parser.add_argument('--history-readers', type=int, default=1, help="/history clients")
+    parser.add_argument('--think-time', type=float, default=0.2, help="Pause between requests per client")
+    parser.add_argument('--references', type=int, default=3, help="Reference images seeded per movement")
+    parser.add_argument('--images-dir', default=UPLOAD_DIR, help="Images for the fake camera and uploads")
+    parser.add_argument('--real-model', action='store_true', help="Use YOLO instead of the stub model")
+    parser.add_argument('--stub-latency', type=float, default=0.03, help="Stub model seconds per inference")
+    parser.add_argument('--port', type=int, default=0, help="Port to bind (0 = any free port)")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    images = find_images(args.images_dir)
+    frames = load_frames(images)
+    if not frames:
+        print(f"No images found in {args.images_dir}", file=sys.stderr)
+        return 1
+
+    workdir = tempfile.mkdtemp(prefix="pose_loadtest_")
+    upload_folder = os.path.join(workdir, "uploads")
+    os.makedirs(upload_folder)
+
+    import database
+    if not args.real_model:
+        StubPoseModel.latency = args.stub_latency
+        pose_logic.set_model(StubPoseModel())
+    # Must be set before app is imported, it initialises the DB on import
+    database.DB_NAME = os.path.join(workdir, "history.db")
+
+    import app as server
+    import sessions
+    from werkzeug.serving import make_server
+
+    server.app.config['UPLOAD_FOLDER'] = upload_folder
+    manager = server.session_manager
+    manager.upload_folder = upload_folder
+    manager.pool = sessions.InferencePool(args.workers, None if args.real_model else StubPoseModel)
+
+    camera = lambda: LoopingImageSource(frames, args.camera_fps)
+    session_names = []
+    for name in list(manager.sessions):
+        manager.remove(name)
+    for i in range(max(1, args.sessions)):
+        name = sessions.DEFAULT_SESSION if i == 0 else f"load{i}"
+        manager.create(name, camera, args.max_fps)
+        session_names.append(name)
+
+    # Per-request access logs would swamp the report
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    httpd = make_server('127.0.0.1', args.port, server.app, threaded=True)
+    base_url = f"http://127.0.0.1:{httpd.server_port}"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    recorder = Recorder()
+    try:
+        # Seed references so scoring does real work
+        for mov in sessions.MOVEMENTS:
+            picks = random.sample(images, min(args.references, len(images)))
+            files = []
+            for path in picks:
+                with open(path, 'rb') as f:
+                    files.append(('files', os.path.basename(path), f.read()))
+            body, content_type = encode_multipart({'movement': mov}, files)
+            timed_request(Recorder(), 'seed', f"{base_url}/upload_references", body, content_type, timeout=120)
+
+        stop_at = time.time() + args.warmup + args.duration
+        threads = []
+        for i in range(args.viewers):
+            session = session_names[i % len(session_names)]
+            threads.append(threading.Thread(target=stream_viewer, args=(base_url, session, stop_at, recorder, i)))
+        # Let sessions open their sources before request clients start measuring
+        for t in threads:
+            t.start()
+        time.sleep(args.warmup)
+
+        measure_start = time.time()
+        clients = []
+        for i in range(args.pollers):
+            session = session_names[i % len(session_names)]
+            clients.append(threading.Thread(target=status_poller, args=(base_url, session, stop_at, recorder)))
+        for i in range(args.uploaders):
+            session = session_names[i % len(session_names)]
+            clients.append(threading.Thread(target=uploader, args=(base_url, session, stop_at, recorder, images,
+                                                                  sessions.MOVEMENTS, args.think_time)))
+        for i in range(args.history_readers):
+            clients.append(threading.Thread(target=history_reader, args=(base_url, stop_at, recorder, args.think_time)))
+        for t in clients:
+            t.start()
+        for t in threads + clients:
+            t.join()
+        measured = time.time() - measure_start
+
+        report = {
+            'config': {k: v for k, v in vars(args).items() if k != 'output'},
+            'duration_s': measured,
+            'endpoints': {name: summarize(samples, measured) for name, samples in sorted(recorder.samples.items())},
+            'streams': {
+                'clients': sorted(recorder.streams, key=lambda s: s['client']),
+                'mean_fps': float(np.mean([s['fps'] for s in recorder.streams])) if recorder.streams else None,
+                'min_fps': min((s['fps'] for s in recorder.streams), default=None),
+                'errors': sum(1 for s in recorder.streams if s['error'])
+            },
+            'sessions': {name: manager.get(name).status() for name in session_names}
+        }
+    finally:
+        for name in session_names:
+            manager.remove(name)
+        httpd.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
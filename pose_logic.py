@@ -1,30 +1,70 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
 import json
 import os
 
-# Load model once
-model = YOLO("yolov8n-pose.pt")
+MODEL_PATH = "yolov8n-pose.pt"
+
+def load_model():
+    """
+    Load a fresh YOLO pose model instance.
+    """
+    from ultralytics import YOLO
+    return YOLO(MODEL_PATH)
+
+# Shared model, loaded once on first use
+model = None
+
+def get_model():
+    global model
+    if model is None:
+        model = load_model()
+    return model
+
+def set_inference_threads(count):
+    """
+    Limit the CPU threads one process uses for inference, so several
+    forked workers do not each grab every core.
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(max(1, int(count)))
+
+def set_model(pose_model):
+    """
+    Replace the shared model (e.g. with a stub for load testing).
+    Must be called before the inference pool is created.
+    """
+    global model
+    model = pose_model
 
 CONFIG_FILE = "config.json"
 
-def load_config_threshold():
+def load_config():
+    """
+    Read config.json; returns an empty dict if it is missing or unreadable.
+    """
     if os.path.exists(CONFIG_FILE):
         try:
             with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                return config.get('threshold', 0.95)
+                return json.load(f)
         except Exception:
-            return 0.95
-    return 0.95
+            pass
+    return {}
+
+def load_config_threshold():
+    return load_config().get('threshold', 0.95)
 
-def extract_keypoints(image):
+def extract_keypoints(image, pose_model=None):
     """
     Run YOLO pose on an image (numpy array).
     Returns a list of keypoints (x, y, conf) for the primary person detected.
     """
-    results = model(image, verbose=False)
+    if pose_model is None:
+        pose_model = get_model()
+    results = pose_model(image, verbose=False)
     if not results:
         return None
     
@@ -98,11 +138,95 @@ def calculate_similarity(embedding_a, embedding_b):
     similarity = dot_product / (norm_a * norm_b)
     return max(0.0, float(similarity))
 
-def get_skeleton_and_embedding(frame):
+def normalize_keypoints_batch(kpts):
+    """
+    Vectorized normalize_keypoints for many people at once (same semantics).
+    kpts: (N, 17, 3) array [x, y, conf]
+    Returns (embeddings (N, 24), joint_mask (N, 12), valid (N,))
+    valid is False where fewer than 4 body joints pass the confidence mask;
+    those embeddings are all zeros, like the scalar version.
+    """
+    kpts = np.asarray(kpts, dtype=np.float64)
+    if kpts.ndim == 2:
+        kpts = kpts[np.newaxis]
+    n = kpts.shape[0]
+
+    # Body keypoints only (ignore head 0-4)
+    points = kpts[:, 5:17, :2] # (N, 12, 2)
+    joint_mask = kpts[:, 5:17, 2] > 0.3
+    valid = joint_mask.sum(axis=1) >= 4
+
+    with np.errstate(invalid='ignore'):
+        # Bounding box of valid points (inf/nan for rows without any, masked out below)
+        mask3 = joint_mask[:, :, np.newaxis]
+        min_coords = np.where(mask3, points, np.inf).min(axis=1)
+        max_coords = np.where(mask3, points, -np.inf).max(axis=1)
+        bbox_center = (min_coords + max_coords) / 2
+        bbox_scale = np.linalg.norm(max_coords - min_coords, axis=1)
+
+        # Torso center/scale where both shoulders (0,1) and hips (6,7) are valid
+        torso_ok = joint_mask[:, [0, 1, 6, 7]].all(axis=1)
+        shoulders = points[:, [0, 1]]
+        hips = points[:, [6, 7]]
+        torso_center = np.concatenate((shoulders, hips), axis=1).mean(axis=1)
+        torso_len = np.linalg.norm(shoulders.mean(axis=1) - hips.mean(axis=1), axis=1)
+        torso_scale = np.where(torso_len > 0.05, torso_len, bbox_scale)
+
+        center = np.where(torso_ok[:, np.newaxis], torso_center, bbox_center)
+        scale = np.where(torso_ok, torso_scale, bbox_scale)
+        scale = np.where(scale == 0, 1.0, scale)
+
+    center = np.where(valid[:, np.newaxis], center, 0.0)
+    scale = np.where(valid, scale, 1.0)
+    norm_points = (points - center[:, np.newaxis, :]) / scale[:, np.newaxis, np.newaxis]
+
+    # Zero out invalid joints and poses with too few joints
+    keep = joint_mask & valid[:, np.newaxis]
+    norm_points = np.where(keep[:, :, np.newaxis], norm_points, 0.0)
+    return norm_points.reshape(n, 24), joint_mask, valid
+
+def similarity_matrix(embeddings_a, embeddings_b):
+    """
+    Cosine similarity of every row of embeddings_a (N, D) against every row of
+    embeddings_b (M, D). Returns (N, M), clamped at 0; zero vectors score 0.
+    """
+    a = np.asarray(embeddings_a, dtype=np.float64)
+    a = a.reshape(-1, a.shape[-1])
+    b = np.asarray(embeddings_b, dtype=np.float64).reshape(-1, a.shape[1])
+
+    norm_a = np.linalg.norm(a, axis=1)
+    norm_b = np.linalg.norm(b, axis=1)
+    denom = np.outer(norm_a, norm_b)
+    dots = a @ b.T
+    similarity = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+    return np.maximum(similarity, 0.0)
+
+def check_pose_batch(live_embeddings, reference_embeddings, threshold=None):
+    """
+    Vectorized check_pose_direct: score N live embeddings against all references.
+    Returns (is_match (N,), best_score (N,), best_idx (N,)); best_idx is -1 when nothing scores above 0.
+    """
+    if threshold is None:
+        threshold = load_config_threshold()
+
+    sims = similarity_matrix(live_embeddings, reference_embeddings)
+    n = sims.shape[0]
+    if sims.shape[1] == 0:
+        return np.zeros(n, dtype=bool), np.zeros(n), np.full(n, -1)
+
+    best_idx = np.argmax(sims, axis=1)
+    best_score = sims[np.arange(n), best_idx]
+    best_idx = np.where(best_score > 0, best_idx, -1)
+    return best_score >= threshold, best_score, best_idx
+
+def get_skeleton_and_embedding(frame, pose_model=None):
     """
     Runs model once and returns (annotated_frame, embedding, kpts)
+    pose_model: optional model instance (e.g. from the inference pool), defaults to the shared model.
     """
-    results = model(frame, verbose=False)
+    if pose_model is None:
+        pose_model = get_model()
+    results = pose_model(frame, verbose=False)
     annotated_frame = frame.copy()
     
     if results and results[0].keypoints and len(results[0].keypoints.data) > 0:
@@ -113,6 +237,56 @@ def get_skeleton_and_embedding(frame):
     
     return annotated_frame, None, None
 
+def get_keypoints_and_embedding(image, pose_model=None):
+    """
+    Like get_skeleton_and_embedding but without drawing (annotated views are rendered on demand).
+    Returns (embedding, kpts) or (None, None) if no person is found.
+    """
+    kpts = extract_keypoints(image, pose_model)
+    if kpts is None:
+        return None, None
+    return normalize_keypoints(kpts), kpts
+
+# COCO skeleton (0-based keypoint indices), same layout as the YOLO plot
+SKELETON = [(15, 13), (13, 11), (16, 14), (14, 12), (11, 12), (5, 11), (6, 12), (5, 6), (5, 7),
+            (6, 8), (7, 9), (8, 10), (1, 2), (0, 1), (0, 2), (1, 3), (2, 4), (3, 5), (4, 6)]
+
+def keypoints_to_json(kpts, image_shape):
+    """
+    Serialize keypoints with the size of the image they were detected on.
+    kpts=None records that detection ran and found no person.
+    """
+    h, w = image_shape[:2]
+    if kpts is not None:
+        kpts = np.round(np.asarray(kpts, dtype=np.float64), 2).tolist()
+    return json.dumps({'width': int(w), 'height': int(h), 'keypoints': kpts})
+
+def keypoints_from_json(text):
+    """
+    Returns (kpts (17, 3), (height, width)) or (None, None).
+    """
+    if not text:
+        return None, None
+    data = json.loads(text)
+    if data.get('keypoints') is None:
+        return None, None
+    return np.asarray(data['keypoints'], dtype=np.float32), (data['height'], data['width'])
+
+def draw_skeleton(image, kpts, conf_threshold=0.3):
+    """
+    Draw limbs and joints on image (in place). kpts must be in image pixel coordinates.
+    """
+    h, w = image.shape[:2]
+    thickness = max(1, round(min(h, w) / 240))
+    visible = kpts[:, 2] > conf_threshold
+    for a, b in SKELETON:
+        if visible[a] and visible[b]:
+            cv2.line(image, (int(kpts[a, 0]), int(kpts[a, 1])), (int(kpts[b, 0]), int(kpts[b, 1])),
+                     (255, 128, 0), thickness, cv2.LINE_AA)
+    for x, y, conf in kpts[visible]:
+        cv2.circle(image, (int(x), int(y)), thickness + 2, (0, 255, 0), -1, cv2.LINE_AA)
+    return image
+
 def check_pose_direct(live_embedding, reference_embeddings, threshold=None):
     """
     Compare a pre-calculated embedding against references.
@@ -0,0 +1,12 @@
+#!/bin/sh
+# Production server (Linux/macOS). On Windows use run_app.bat.
+PYTHON_EXE=python3
+if [ -x ".venv/bin/python" ]; then
+    PYTHON_EXE=.venv/bin/python
+    echo "Using Virtual Environment..."
+fi
+
+echo "Installing dependencies..."
+"$PYTHON_EXE" -m pip install -r requirements.txt
+echo "Starting Server..."
+exec "$PYTHON_EXE" -m gunicorn -c gunicorn.conf.py wsgi:app
@@ -0,0 +1,647 @@
+import cv2
+import time
+import os
+import glob
+import json
+import re
+import threading
+import collections
+from contextlib import contextmanager
+import numpy as np
+import pose_logic
+import database
+import imaging
+
+MOVEMENTS = ['Sikap Siap', 'Serangan Dasar']
+DEFAULT_SESSION = 'default'
+DEFAULT_MAX_FPS = 15
+IDLE_TIMEOUT = 10.0 # Seconds without viewers before a session releases its camera
+SHARED_MAX_AGE = 2.0 # Older files from the capture process are treated as stale (pre-fork mode)
+DEMAND_INTERVAL = 1.0 # How often a non-capture worker signals demand (pre-fork mode)
+
+def load_session_config():
+    """
+    Read the 'sessions', 'inference_workers' and 'allowed_sources' entries from config.json.
+    Returns (sessions_dict, inference_workers, allowed_sources). Sources of the
+    configured sessions are always allowed.
+    """
+    config = pose_logic.load_config()
+    sessions = {DEFAULT_SESSION: {'source': None, 'max_fps': DEFAULT_MAX_FPS}}
+    workers = 1
+    allowed = []
+    try:
+        sessions.update(config.get('sessions', {}))
+        workers = int(config.get('inference_workers', 1))
+        allowed = list(config.get('allowed_sources', []))
+    except (TypeError, ValueError):
+        pass
+    allowed += [cfg.get('source') for cfg in sessions.values() if isinstance(cfg.get('source'), str)]
+    return sessions, max(1, workers), set(allowed)
+
+def new_verification():
+    return {'start_time': None, 'verified': False, 'last_status': 'Waiting...', 'progress': 0}
+
+def write_atomic(path, data):
+    # Readers in other processes see either the old or the new file, never half of one.
+    # The temporary name is unique per thread, gthread workers write concurrently
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def read_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def camera_not_found_jpeg():
+    # Create a black image with error text
+    blank_image = np.zeros((480, 640, 3), np.uint8)
+    cv2.putText(blank_image, "CAMERA NOT FOUND", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    return imaging.encode_jpeg(blank_image)
+
+
+class InferencePool:
+    """
+    Fixed set of pose models shared by all sessions.
+    Waiters are served strictly in arrival order, so every session gets its turn
+    and no single camera can starve the others.
+    """
+    def __init__(self, size=1, factory=None):
+        factory = factory or pose_logic.load_model
+        self.models = [pose_logic.get_model()] + [factory() for _ in range(size - 1)]
+        self._free = list(self.models)
+        self._waiting = collections.deque()
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        return len(self.models)
+
+    @contextmanager
+    def acquire(self):
+        ticket = object()
+        with self._cond:
+            self._waiting.append(ticket)
+            while self._waiting[0] is not ticket or not self._free:
+                self._cond.wait()
+            self._waiting.popleft()
+            pose_model = self._free.pop()
+            # Next in line may be able to take another free model
+            self._cond.notify_all()
+        try:
+            yield pose_model
+        finally:
+            with self._cond:
+                self._free.append(pose_model)
+                self._cond.notify_all()
+
+
+class Session:
+    """
+    One training station: a video source, its target movement and verification state.
+    Frames are captured and scored by a single background thread; any number of
+    viewers read the latest encoded frame.
+    """
+    def __init__(self, manager, name, source=None, max_fps=DEFAULT_MAX_FPS):
+        self.manager = manager
+        self.name = name
+        self.source = source
+        self.max_fps = float(max_fps) if max_fps else DEFAULT_MAX_FPS
+
+        self._movement = MOVEMENTS[0] # Read through current_movement
+        self.detected_movement = 'None'
+        self.scores = {mov: 0.0 for mov in MOVEMENTS}
+        self.verification = new_verification()
+        self.fps = 0.0
+
+        self.camera = None
+        self.latest_frame = None # Raw resized frame, used by instant verification
+        self.latest_jpeg = None
+        self.frame_id = 0
+        self.viewers = 0
+        self.remote_viewers = 0 # Viewers on the other workers (pre-fork mode, capture process)
+        self.last_demand = 0.0
+        self.closed = False
+        self.control_version = None
+
+        self.lock = threading.Lock()
+        self.frame_cond = threading.Condition()
+        self.thread = None
+
+    # --- Video source ---
+    def open_source(self):
+        if callable(self.source):
+            cap = self.source()
+            return cap if cap is not None and cap.isOpened() else None
+        if self.source is not None:
+            cap = cv2.VideoCapture(self.source)
+            if cap.isOpened():
+                return cap
+            cap.release()
+            print(f"[{self.name}] Error: Could not open source {self.source}")
+            return None
+        # Try indices 0, 1, 2
+        for idx in range(3):
+            print(f"[{self.name}] Trying to open camera index {idx}...")
+            cap = cv2.VideoCapture(idx)
+            if cap.isOpened():
+                ret, frame = cap.read()
+                if ret:
+                    print(f"[{self.name}] Camera found at index {idx}")
+                    return cap
+                else:
+                    cap.release()
+        print(f"[{self.name}] Error: No working camera found on indices 0-2.")
+        return None
+
+    def release_camera(self):
+        if self.camera is not None:
+            self.camera.release()
+            self.camera = None
+
+    # --- Lifecycle ---
+    def touch(self):
+        self.last_demand = time.time()
+
+    def ensure_running(self):
+        self.touch()
+        self.start()
+
+    def start(self):
+        with self.lock:
+            if self.closed:
+                return
+            if self.thread is None or not self.thread.is_alive():
+                # Only the capture process reads the camera, other workers follow its output
+                target = self.run if self.manager.is_owner else self.run_mirror
+                self.thread = threading.Thread(target=target, name=f"session-{self.name}", daemon=True)
+                self.thread.start()
+
+    def is_mirror(self):
+        return self.manager.shared_dir is not None and not self.manager.is_owner
+
+    def close(self):
+        self.closed = True
+
+    def is_idle(self):
+        return self.viewers == 0 and time.time() - self.last_demand > IDLE_TIMEOUT
+
+    def clear_frame(self):
+        # Never hand out a frame from before the capture stopped
+        with self.frame_cond:
+            self.latest_frame = None
+            self.latest_jpeg = None
+
+    def publish(self, jpeg, frame=None):
+        with self.frame_cond:
+            self.latest_jpeg = jpeg
+            self.latest_frame = frame
+            self.frame_id += 1
+            self.frame_cond.notify_all()
+
+    def run(self):
+        interval = 1.0 / self.max_fps
+        last_tick = None
+        while not self.closed and not self.is_idle():
+            tick = time.time()
+            if self.manager.refresh_references:
+                self.manager.refresh_references()
+            if self.manager.shared_dir:
+                self.apply_remote_control()
+
+            if self.camera is None or not self.camera.isOpened():
+                self.camera = self.open_source()
+                if self.camera is None:
+                    # Show an error image and wait before retrying
+                    self.publish(camera_not_found_jpeg())
+                    if self.manager.shared_dir:
+                        self.export(self.latest_jpeg)
+                    time.sleep(2)
+                    continue
+
+            success, frame = self.camera.read()
+            if not success:
+                print(f"[{self.name}] Failed to read frame. Releasing camera.")
+                self.release_camera() # Force re-discovery
+                continue
+
+            # Resize for performance
+            frame = cv2.resize(frame, (640, 480))
+
+            with self.manager.pool.acquire() as pose_model:
+                annotated_frame, live_embedding, kpts = pose_logic.get_skeleton_and_embedding(frame, pose_model)
+
+            self.process_frame(annotated_frame, live_embedding, frame, kpts)
+            jpeg = imaging.encode_jpeg(annotated_frame)
+            if jpeg is None:
+                print(f"[{self.name}] Failed to encode frame.")
+                continue
+            self.publish(jpeg, frame)
+            if self.manager.shared_dir:
+                self.export(self.latest_jpeg, frame)
+
+            if last_tick is not None:
+                self.fps = 0.9 * self.fps + 0.1 * (1.0 / max(1e-6, tick - last_tick))
+            last_tick = tick
+
+            # Hold the configured frame rate so sessions share the pool evenly
+            remaining = interval - (time.time() - tick)
+            if remaining > 0:
+                time.sleep(remaining)
+
+        self.release_camera()
+        self.fps = 0.0
+        self.clear_frame()
+        print(f"[{self.name}] Session capture stopped.")
+
+    # --- Pre-fork mode: frames, status and control exchanged through files ---
+    def shared_path(self, suffix):
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', self.name)
+        return os.path.join(self.manager.shared_dir, f"{safe_name}{suffix}")
+
+    def export(self, jpeg, frame=None):
+        """
+        Capture process: make the latest frame and status visible to the other workers.
+        """
+        write_atomic(self.shared_path('.jpg'), jpeg)
+        raw = imaging.encode_jpeg(frame) if frame is not None else None
+        if raw is not None:
+            write_atomic(self.shared_path('.raw.jpg'), raw)
+        status = dict(self.status(), frame_id=self.frame_id, time=time.time())
+        write_atomic(self.shared_path('.json'), json.dumps(status).encode())
+
+    def apply_remote_control(self):
+        """
+        Pick up movement changes made through any worker. In pre-fork mode the
+        control file is the only source of truth for the target movement.
+        """
+        try:
+            st = os.stat(self.shared_path('.control.json'))
+        except OSError:
+            return
+        # write_atomic replaces the file, so a new inode means new content
+        version = (st.st_ino, st.st_mtime_ns)
+        if version == self.control_version:
+            return
+        self.control_version = version
+        try:
+            control = json.loads(read_file(self.shared_path('.control.json')) or b'{}')
+        except ValueError:
+            return
+        if control.get('movement') and control['movement'] != self._movement:
+            self._movement = control['movement']
+            self.verification = new_verification()
+
+    def collect_demand(self):
+        """
+        Capture process: demand and viewer counts signalled by the other workers,
+        one <session>.demand.<pid> file each.
+        """
+        now = time.time()
+        viewers = 0
+        for path in glob.glob(self.shared_path('.demand.*')):
+            if path.endswith('.tmp'):
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if now - mtime > 60:
+                # Left behind by a worker that is gone
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            self.last_demand = max(self.last_demand, mtime)
+            if now - mtime <= SHARED_MAX_AGE:
+                try:
+                    viewers += int(read_file(path) or 0)
+                except ValueError:
+                    pass
+        self.remote_viewers = viewers
+
+    def run_mirror(self):
+        """
+        Non-capture worker: follow the frames published by the capture process
+        and keep signalling demand while someone is watching here.
+        """
+        last_frame_id = None
+        last_signal = 0.0
+        demand_path = self.shared_path(f'.demand.{os.getpid()}')
+        while not self.closed and not self.is_idle() and not self.manager.is_owner:
+            if time.time() - last_signal >= DEMAND_INTERVAL:
+                # The capture process polls every 0.5 s and idles after IDLE_TIMEOUT
+                write_atomic(demand_path, str(self.viewers).encode())
+                last_signal = time.time()
+            status = self.read_shared_status()
+            if status and status.get('frame_id') != last_frame_id:
+                jpeg = read_file(self.shared_path('.jpg'))
+                if jpeg:
+                    last_frame_id = status.get('frame_id')
+                    self.publish(jpeg)
+            time.sleep(0.5 / self.max_fps)
+        self.clear_frame()
+
+    def read_shared_status(self):
+        """
+        Non-capture worker: status last published by the capture process,
+        or None if there is none or it is older than SHARED_MAX_AGE
+        (e.g. left over from a previous owner or server run).
+        """
+        try:
+            status = json.loads(read_file(self.shared_path('.json')) or b'null')
+        except ValueError:
+            return None
+        if not isinstance(status, dict) or time.time() - status.get('time', 0) > SHARED_MAX_AGE:
+            return None
+        return status
+
+    def read_shared_frame(self):
+        """
+        Non-capture worker: current raw frame of the capture process, or None if stale.
+        """
+        path = self.shared_path('.raw.jpg')
+        try:
+            if time.time() - os.stat(path).st_mtime > SHARED_MAX_AGE:
+                return None
+        except OSError:
+            return None
+        data = read_file(path)
+        if not data:
+            return None
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    # --- Scoring ---
+    def process_frame(self, annotated_frame, live_embedding, frame, kpts):
+        ref_filenames = self.manager.ref_filenames
+
+        # Multi-movement logic
+        max_total_score = 0.0
+        detected_mov = "None"
+
+        # Score the live embedding against the references of every movement in one call
+        matrix, ranges = self.manager.reference_matrix()
+        if live_embedding is not None and len(matrix):
+            sims = pose_logic.similarity_matrix(live_embedding, matrix)[0]
+        else:
+            sims = np.zeros(len(matrix))
+
+        best = {}
+        for mov_name in MOVEMENTS:
+            start, end = ranges[mov_name]
+            idx = int(np.argmax(sims[start:end])) if end > start else -1
+            score = float(sims[start + idx]) if idx != -1 else 0.0
+            # Same as check_pose_direct: no best reference unless something scores above 0
+            best[mov_name] = (score, idx if score > 0 else -1)
+            self.scores[mov_name] = score
+
+            if score > max_total_score:
+                max_total_score = score
+                detected_mov = mov_name
+
+        # Confidence threshold for labeling
+        if max_total_score < 0.6:
+            self.detected_movement = "Neutral / Unknown"
+        else:
+            self.detected_movement = detected_mov
+
+        # Verification Logic (focused on 'current_movement')
+        target_mov = self.current_movement
+        target_ref_files = ref_filenames.get(target_mov, [])
+
+        # Target score and best reference come from the same similarity row
+        score, best_idx = best.get(target_mov, (0.0, -1))
+        is_match = best_idx != -1 and score >= pose_logic.load_config_threshold()
+
+        # Competitive check: Target must also be the best match
+        is_match = is_match and (detected_mov == target_mov)
+
+        verification = self.verification
+
+        # 5-second rule logic
+        if is_match:
+            if verification['start_time'] is None:
+                verification['start_time'] = time.time()
+                print(f"[{self.name}] Match found for {target_mov} ({score:.2f}). Starting timer...")
+
+            elapsed = time.time() - verification['start_time']
+            verification['progress'] = min(100, (elapsed / 5.0) * 100)
+            verification['last_status'] = f"Holding {target_mov}... {elapsed:.1f}s"
+
+            if elapsed >= 5.0 and not verification['verified']:
+                verification['verified'] = True
+                verification['last_status'] = "VERIFIED!"
+                # Save to history (plain frame, the skeleton is drawn on request)
+                filename = f"verified_{self.name}_{int(time.time())}.jpg"
+                filepath = os.path.join(self.manager.upload_folder, filename)
+                cv2.imwrite(filepath, frame)
+
+                # Best match filename
+                best_ref = target_ref_files[best_idx] if best_idx != -1 and best_idx < len(target_ref_files) else ""
+                database.add_record(target_mov, "Correct", filename, best_ref, float(score),
+                                    pose_logic.keypoints_to_json(kpts, frame.shape))
+                print(f"[{self.name}] VERIFIED: {target_mov} saved to history")
+
+            # Draw Progress Bar and Info on Frame
+            cv2.rectangle(annotated_frame, (50, 400), (int(50 + 5.4 * verification['progress']), 430), (0, 255, 0), -1)
+            cv2.putText(annotated_frame, f"Match: {score:.2f} ({target_mov})", (50, 450), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+        else:
+            verification['start_time'] = None
+            verification['progress'] = 0
+            verification['verified'] = False
+            verification['last_status'] = f"Incorrect Pose (Need {target_mov})"
+            cv2.putText(annotated_frame, f"Wait: {target_mov} ({score:.2f})", (50, 450), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+        # Draw Detection Label
+        cv2.putText(annotated_frame, f"Detected: {self.detected_movement}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+
+    # --- Viewer / API helpers ---
+    @property
+    def current_movement(self):
+        if self.manager.shared_dir:
+            self.apply_remote_control()
+        return self._movement
+
+    def set_movement(self, movement):
+        if self.manager.shared_dir:
+            write_atomic(self.shared_path('.control.json'), json.dumps({'movement': movement}).encode())
+        self._movement = movement
+        # Reset verification state
+        self.verification = new_verification()
+
+    def status(self):
+        # Live state comes from the capture process, whether or not this worker streams
+        remote = self.read_shared_status() if self.is_mirror() else None
+        if remote:
+            # Viewers as counted by the capture process, the same on every worker
+            status = {k: v for k, v in remote.items() if k not in ('frame_id', 'time')}
+            status['movement'] = self.current_movement
+            status['ref_counts'] = {mov: len(self.manager.references.get(mov, [])) for mov in MOVEMENTS}
+            return status
+
+        verification = self.verification
+        return {
+            'session': self.name,
+            'movement': self.current_movement,
+            'detected': self.detected_movement,
+            'scores': dict(self.scores),
+            'status': verification['last_status'],
+            'progress': verification['progress'],
+            'verified': verification['verified'],
+            'fps': round(self.fps, 1),
+            'viewers': self.viewers + self.remote_viewers,
+            'ref_counts': {mov: len(self.manager.references.get(mov, [])) for mov in MOVEMENTS}
+        }
+
+    def info(self):
+        return {
+            'name': self.name,
+            'source': self.source if not callable(self.source) else repr(self.source),
+            'max_fps': self.max_fps,
+            'movement': self.current_movement,
+            'running': self.thread is not None and self.thread.is_alive(),
+            'fps': round(self.fps, 1),
+            'viewers': self.viewers
+        }
+
+    def wait_for_frame(self, last_id, timeout=2.0):
+        """
+        Block until a frame newer than last_id is published.
+        Returns (frame_id, jpeg_bytes, raw_frame).
+        """
+        with self.frame_cond:
+            if self.frame_id == last_id:
+                self.frame_cond.wait(timeout)
+            return self.frame_id, self.latest_jpeg, self.latest_frame
+
+    def generate_frames(self):
+        self.ensure_running()
+        with self.lock:
+            self.viewers += 1
+        last_id = -1
+        try:
+            while not self.closed:
+                self.ensure_running()
+                frame_id, jpeg, _ = self.wait_for_frame(last_id)
+                if jpeg is None or frame_id == last_id:
+                    continue
+                last_id = frame_id
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            with self.lock:
+                self.viewers -= 1
+
+    def capture_frame(self, timeout=5.0):
+        """
+        Return the most recent raw frame, starting capture if needed.
+        """
+        self.ensure_running()
+        deadline = time.time() + timeout
+        frame_id, _, frame = self.wait_for_frame(-1, timeout=0)
+        while frame is None and time.time() < deadline:
+            # The capture thread may have been stopping while we asked it to run
+            self.ensure_running()
+            if self.is_mirror():
+                frame = self.read_shared_frame()
+                if frame is not None:
+                    break
+            frame_id, _, frame = self.wait_for_frame(frame_id, timeout=min(0.5, max(0.0, deadline - time.time())))
+        return frame
+
+
+class SessionManager:
+    """
+    Registry of named sessions sharing one reference set and one inference pool.
+    """
+    def __init__(self, references, ref_filenames, upload_folder, pool_size=1, model_factory=None):
+        self.references = references
+        self.ref_filenames = ref_filenames
+        self.upload_folder = upload_folder
+        self.pool = InferencePool(pool_size, model_factory)
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.refresh_references = None # Optional callable, run by capture threads
+        self._ref_matrix = None
+
+        # Pre-fork mode (see enable_shared_capture); a single process owns every camera
+        self.shared_dir = None
+        self.is_owner = True
+        self._lock_file = None
+
+    def reference_matrix(self):
+        """
+        All reference embeddings stacked into one (M, 24) matrix, plus the row range
+        of each movement. Rebuilt only when the reference lists change.
+        """
+        lists = [self.references.get(mov, []) for mov in MOVEMENTS]
+        cached = self._ref_matrix
+        if cached is None or any(old is not new or len(old) != size
+                                 for old, new, size in zip(cached[0], lists, cached[3])):
+            rows = [emb for refs in lists for emb in refs]
+            matrix = np.stack(rows) if rows else np.zeros((0, 24))
+            ranges, start = {}, 0
+            for mov, refs in zip(MOVEMENTS, lists):
+                ranges[mov] = (start, start + len(refs))
+                start += len(refs)
+            cached = self._ref_matrix = (lists, matrix, ranges, [len(refs) for refs in lists])
+        return cached[1], cached[2]
+
+    def enable_shared_capture(self, runtime_dir):
+        """
+        Call in each forked worker. Workers compete for a file lock; the holder runs
+        camera capture and inference for all sessions and publishes frames/status to
+        runtime_dir, the others serve those files. If the holder dies another worker
+        takes over.
+        """
+        os.makedirs(runtime_dir, exist_ok=True)
+        self.shared_dir = runtime_dir
+        self.is_owner = False
+        threading.Thread(target=self._capture_owner_loop, name="capture-owner", daemon=True).start()
+
+    def _capture_owner_loop(self):
+        import fcntl
+        self._lock_file = open(os.path.join(self.shared_dir, 'capture.lock'), 'w')
+        while True:
+            try:
+                # Held until this process exits
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                time.sleep(2)
+        self.is_owner = True
+        print(f"Process {os.getpid()} now owns camera capture")
+
+        # Start capture for sessions watched through any worker
+        while True:
+            for session in list(self.sessions.values()):
+                session.collect_demand()
+                if not session.is_idle():
+                    session.start()
+            time.sleep(0.5)
+
+    def create(self, name, source=None, max_fps=DEFAULT_MAX_FPS):
+        with self.lock:
+            if name in self.sessions:
+                raise ValueError(f"Session '{name}' already exists")
+            session = Session(self, name, source, max_fps)
+            self.sessions[name] = session
+            return session
+
+    def get(self, name):
+        return self.sessions.get(name)
+
+    def remove(self, name):
+        with self.lock:
+            session = self.sessions.pop(name, None)
+        if session:
+            session.close()
+        return session
+
+    def list(self):
+        return [s.info() for s in self.sessions.values()]
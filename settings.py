@@ -19,8 +19,17 @@ def save_threshold(value):
     try:
         val = float(value)
         if 0 <= val <= 1:
+            # Keep other entries (sessions, workers) intact
+            config = {}
+            if os.path.exists(CONFIG_FILE):
+                try:
+                    with open(CONFIG_FILE, 'r') as f:
+                        config = json.load(f)
+                except Exception:
+                    config = {}
+            config["threshold"] = val
             with open(CONFIG_FILE, 'w') as f:
-                json.dump({"threshold": val}, f, indent=4)
+                json.dump(config, f, indent=4)
             return True
         else:
             messagebox.showerror("Error", "Threshold must be between 0 and 1")
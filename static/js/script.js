@@ -1,8 +1,19 @@
 const state = {
     movement: 'Sikap Siap',
-    mode: 'webcam'
+    mode: 'webcam',
+    session: document.body.dataset.session || 'default'
 };
 
+// Annotated view rendered by the server at the requested width
+function annotatedUrl(filename, width) {
+    return `/annotated/${encodeURIComponent(filename)}?w=${width}`;
+}
+
+// Per-session API route (e.g. /session/mat1/status)
+function sessionUrl(path) {
+    return `/session/${encodeURIComponent(state.session)}${path}`;
+}
+
 document.addEventListener('DOMContentLoaded', () => {
     loadHistory();
     loadReferences(state.movement);
@@ -38,7 +49,7 @@ function setMovement(mov) {
     // Load References for this movement
     loadReferences(mov);
 
-    fetch('/set_movement', {
+    fetch(sessionUrl('/set_movement'), {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ movement: mov })
@@ -76,10 +87,11 @@ function loadReferences(movement) {
                 const card = document.createElement('div');
                 card.type = 'div';
                 card.className = 'ref-card';
-                // Use annotated image for thumbnail
-                const imgPath = `/static/uploads/${ref.filepath_annotated}`;
+                // Annotated thumbnail, full size in the modal
+                const thumbPath = annotatedUrl(ref.filepath_orig, 320);
+                const imgPath = annotatedUrl(ref.filepath_orig, 1280);
                 card.innerHTML = `
-                <img src="${imgPath}" alt="Ref" onclick="openModal('${imgPath}', '${movement}')">
+                <img src="${thumbPath}" alt="Ref" onclick="openModal('${imgPath}', '${movement}')">
                 <button class="ref-del-btn" onclick="deleteReference(${ref.id})"><i class="fa-solid fa-trash"></i></button>
             `;
                 grid.appendChild(card);
@@ -116,8 +128,8 @@ function openHistoryModal(item) {
         if (singleImg) singleImg.style.display = "none";
         compareArea.style.display = "flex";
 
-        resImg.src = `/static/uploads/${item.image_path}`;
-        refImg.src = item.ref_path ? (item.ref_path.startsWith('http') ? item.ref_path : `/static/uploads/${item.ref_path}`) : 'https://placehold.co/300x200?text=No+Match';
+        resImg.src = annotatedUrl(item.image_path, 1280);
+        refImg.src = item.ref_path ? (item.ref_path.startsWith('http') ? item.ref_path : annotatedUrl(item.ref_path, 1280)) : 'https://placehold.co/300x200?text=No+Match';
 
         const scorePercent = item.score ? (item.score * 100).toFixed(1) : "N/A";
         let analysis = "";
@@ -136,7 +148,7 @@ function openHistoryModal(item) {
         `;
     } else {
         // Fallback to single image if comparison elements not found
-        openModal(`/static/uploads/${item.image_path}`, item.movement_type);
+        openModal(annotatedUrl(item.image_path, 1280), item.movement_type);
     }
 }
 
@@ -209,7 +221,7 @@ function verifyInstant() {
     btn.disabled = true;
     btn.innerHTML = `<i class="fa-solid fa-circle-notch fa-spin"></i> Analyzing...`;
 
-    fetch('/verify_instant', {
+    fetch(sessionUrl('/verify_instant'), {
         method: 'POST'
     })
         .then(res => res.json())
@@ -271,6 +283,7 @@ function runStaticVerification() {
     const formData = new FormData();
     formData.append('file', currentUploadFile);
     formData.append('movement', selectedMov);
+    formData.append('session', state.session);
 
     fetch('/verify_image', {
         method: 'POST',
@@ -281,6 +294,12 @@ function runStaticVerification() {
             btn.disabled = false;
             btn.innerHTML = OriginalText;
 
+            if (!data.image_url) {
+                // Nothing was saved (e.g. no person detected), keep the preview
+                alert(data.error || "Verification failed.");
+                return;
+            }
+
             document.getElementById('preview-area').classList.add('hidden');
             const resultContainer = document.getElementById('result-preview-container');
             resultContainer.classList.remove('hidden');
@@ -291,8 +310,8 @@ function runStaticVerification() {
 
             // Create item object for modal consistency
             const item = {
-                image_path: resultUrl.split('/').pop(),
-                ref_path: data.best_ref ? data.best_ref.split('/').pop() : null,
+                image_path: decodeURIComponent(resultUrl.split('/').pop()),
+                ref_path: data.best_ref ? decodeURIComponent(data.best_ref.split('/').pop()) : null,
                 movement_type: selectedMov,
                 result: data.match ? "Correct" : "Incorrect",
                 timestamp: new Date().toLocaleString(),
@@ -367,7 +386,7 @@ function startStatusPolling() {
         // Only poll if in webcam mode
         if (state.mode !== 'webcam') return;
 
-        fetch('/status')
+        fetch(sessionUrl('/status'))
             .then(res => res.json())
             .then(data => {
                 // Update Polling UI
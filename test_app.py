@@ -0,0 +1,74 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image
+import database
+import imaging
+import pose_logic
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "history.db"))
+    # app loads the pose model and references on import; no model is needed here
+    monkeypatch.setattr(pose_logic, "model", object())
+    import app
+    database.init_db()
+    monkeypatch.setitem(app.app.config, "UPLOAD_FOLDER", str(tmp_path))
+    app.render_annotated.cache_clear()
+    return app
+
+def rotated_jpeg():
+    """
+    1600x1200 JPEG stored sideways with EXIF orientation 6, i.e. a 1200x1600 portrait photo.
+    """
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    Image.new("RGB", (1600, 1200)).save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+def test_render_annotated_scales_keypoints(server, tmp_path):
+    data = rotated_jpeg()
+    (tmp_path / "test_rotated.jpg").write_bytes(data)
+
+    # Keypoints are stored at the size the detector saw (upright, reduced decode)
+    detect_img = imaging.decode_image(data)
+    assert detect_img.shape[:2] == (800, 600)
+    kpts = np.zeros((17, 3), dtype=np.float32)
+    kpts[0] = [120, 600, 0.9] # Single visible joint
+    database.add_record("Sikap Siap", "Correct", "test_rotated.jpg", "", 0.9,
+                        pose_logic.keypoints_to_json(kpts, detect_img.shape))
+
+    for width, expected in ((150, (30, 150)), (900, (180, 900))):
+        jpeg = server.render_annotated("test_rotated.jpg", width, 0.0)
+        img = imaging.decode_image(jpeg, target_size=10000)
+        assert img.shape[:2] == (width * 4 // 3, width) # Upright, as the detector saw it
+        x, y = expected
+        assert img[y, x, 1] > 128 # Green joint marker at the rescaled position
+        assert img[y, width - 1 - x, 1] < 64
+
+def test_create_session_rejects_bad_input(server):
+    client = server.app.test_client()
+    for body in ({"name": "x", "source": ["a"]}, {"name": "x", "source": {"a": 1}},
+                 {"name": "x", "source": "/etc/passwd"}, {"name": "x", "max_fps": "abc"},
+                 {"name": "x", "max_fps": 0}):
+        response = client.post("/sessions", json=body)
+        assert response.status_code == 400, body
+    response = client.post("/sessions", json={"name": "x", "source": "1", "max_fps": 5})
+    assert response.status_code == 200
+    assert response.json["session"]["source"] == 1
+    server.session_manager.remove("x")
+
+def test_annotated_route_never_upscales(server, tmp_path):
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480)).save(buffer, "JPEG")
+    (tmp_path / "instant_default_1.jpg").write_bytes(buffer.getvalue())
+    (tmp_path / "test_rotated.jpg").write_bytes(rotated_jpeg())
+    client = server.app.test_client()
+
+    for filename, width in (("instant_default_1.jpg", 640), ("test_rotated.jpg", 1200)):
+        response = client.get(f"/annotated/{filename}?w=1280")
+        assert response.status_code == 200
+        assert Image.open(io.BytesIO(response.data)).size[0] == width
+    response = client.get("/annotated/instant_default_1.jpg?w=320")
+    assert Image.open(io.BytesIO(response.data)).size == (320, 240)
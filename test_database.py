@@ -0,0 +1,54 @@
+import sqlite3
+import pytest
+import database
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "history.db"))
+    database.init_db()
+
+def test_incremental_stats_match_rebuild():
+    database.add_record("Sikap Siap", "Correct", "a.jpg", "", 0.97)
+    database.add_record("Sikap Siap", "Incorrect", "b.jpg", "", 0.42)
+    database.add_record("Serangan Dasar", "Correct", "c.jpg", "", 1.0)
+    database.add_record("Serangan Dasar", "Incorrect", "d.jpg", "", 0.0)
+    first = database.get_history()[-1]
+    database.delete_history_item(first["id"])
+    assert database.check_history_stats() == []
+
+    stats = database.get_history_stats()
+    assert stats["overall"]["total"] == 3
+    sikap = stats["movements"]["Sikap Siap"]
+    assert (sikap["correct"], sikap["incorrect"]) == (0, 1)
+    assert sikap["histogram"][4] == 1
+    serangan = stats["movements"]["Serangan Dasar"]
+    assert serangan["pass_rate"] == 0.5
+    assert abs(serangan["avg_score"] - 0.5) < 1e-9
+    assert serangan["histogram"][9] == 1 and serangan["histogram"][0] == 1
+
+    database.clear_history()
+    assert database.get_history_stats()["overall"]["total"] == 0
+    assert database.check_history_stats() == []
+
+def test_repeated_delete_counts_once():
+    database.add_record("Sikap Siap", "Correct", "a.jpg", "", 0.9)
+    database.add_record("Sikap Siap", "Correct", "b.jpg", "", 0.8)
+    item_id = database.get_history()[0]["id"]
+    database.delete_history_item(item_id)
+    database.delete_history_item(item_id)
+    assert database.get_history_stats()["overall"]["total"] == 1
+    assert database.check_history_stats() == []
+
+def test_init_db_builds_stats_for_existing_history():
+    database.add_record("Sikap Siap", "Correct", "a.jpg", "", 0.9)
+    database.add_record("Sikap Siap", "Correct", "b.jpg", "", 0.8)
+    # Simulate a database from before the summary tables existed
+    conn = sqlite3.connect(database.DB_NAME)
+    conn.execute("DROP TABLE history_stats")
+    conn.execute("DROP TABLE history_score_hist")
+    conn.commit()
+    conn.close()
+
+    database.init_db()
+    assert database.get_history_stats()["movements"]["Sikap Siap"]["total"] == 2
+    assert database.check_history_stats() == []
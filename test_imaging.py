@@ -0,0 +1,43 @@
+import io
+import numpy as np
+from PIL import Image
+import imaging
+
+def encode(size, fmt, exif=None):
+    buffer = io.BytesIO()
+    img = Image.fromarray(np.random.default_rng(0).integers(0, 255, (size[1], size[0], 3), dtype=np.uint8))
+    if exif is not None:
+        img.save(buffer, fmt, exif=exif)
+    else:
+        img.save(buffer, fmt)
+    return buffer.getvalue()
+
+def test_jpeg_decoded_at_reduced_scale():
+    img = imaging.decode_image(encode((2000, 1500), "JPEG"))
+    # Draft mode stops at the smallest DCT scale still covering 640 px (1/2 here)
+    assert img.shape == (750, 1000, 3)
+    assert img.flags["C_CONTIGUOUS"]
+
+def test_jpeg_exif_orientation_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    img = imaging.decode_image(encode((1600, 1200), "JPEG", exif))
+    assert img.shape == (800, 600, 3)
+    img = imaging.decode_image(encode((1600, 1200), "JPEG", exif), target_width=300)
+    assert img.shape[1] >= 300 and img.shape[0] > img.shape[1]
+
+def test_png_box_reduced():
+    img = imaging.decode_image(encode((1600, 1200), "PNG"))
+    assert img.shape == (600, 800, 3)
+
+def test_garbage_bytes():
+    assert imaging.decode_image(b"not an image at all") is None
+
+def test_opencv_fallback_is_reduced(monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("unsupported")
+    monkeypatch.setattr(imaging.Image, "open", fail)
+    img = imaging.decode_image(encode((2000, 1500), "JPEG"))
+    assert img.shape == (750, 1000, 3)
+    img = imaging.decode_image(encode((2000, 1500), "JPEG"), target_size=200)
+    assert img.shape == (188, 250, 3)
@@ -0,0 +1,84 @@
+import numpy as np
+import pose_logic
+
+def random_keypoints(rng, n):
+    """
+    Random (n, 17, 3) keypoints covering the interesting cases:
+    full torso, missing shoulders/hips, too few joints, degenerate torso.
+    """
+    kpts = np.zeros((n, 17, 3), dtype=np.float32)
+    kpts[:, :, :2] = rng.uniform(0, 640, (n, 17, 2))
+    kpts[:, :, 2] = rng.uniform(0, 1, (n, 17))
+    for i in range(n):
+        case = i % 5
+        if case == 0:
+            kpts[i, [5, 6, 11, 12], 2] = 0.9 # Torso path
+        elif case == 1:
+            kpts[i, [5, 11], 2] = 0.1 # Bounding-box fallback
+        elif case == 2:
+            kpts[i, 5:17, 2] = 0.1
+            kpts[i, [7, 8, 9], 2] = 0.9 # Only 3 valid joints
+        elif case == 3:
+            kpts[i, [5, 6, 11, 12], 2] = 0.9
+            kpts[i, [11, 12], :2] = kpts[i, [5, 6], :2] # Zero-length torso
+        else:
+            kpts[i, 5:17, :2] = 100.0
+            kpts[i, 5:17, 2] = 0.9 # All joints on one pixel (scale 0)
+    return kpts
+
+def test_normalize_batch_matches_scalar():
+    rng = np.random.default_rng(0)
+    kpts = random_keypoints(rng, 200)
+    embeddings, joint_mask, valid = pose_logic.normalize_keypoints_batch(kpts)
+
+    assert embeddings.shape == (200, 24)
+    assert joint_mask.shape == (200, 12)
+    assert valid.shape == (200,)
+    for i in range(len(kpts)):
+        expected = pose_logic.normalize_keypoints(kpts[i])
+        np.testing.assert_allclose(embeddings[i], expected, rtol=1e-5, atol=1e-5)
+        assert valid[i] == (np.count_nonzero(kpts[i, 5:17, 2] > 0.3) >= 4)
+
+def test_similarity_matrix_matches_scalar():
+    rng = np.random.default_rng(1)
+    live, _, _ = pose_logic.normalize_keypoints_batch(random_keypoints(rng, 20))
+    refs, _, _ = pose_logic.normalize_keypoints_batch(random_keypoints(rng, 7))
+    sims = pose_logic.similarity_matrix(live, refs)
+
+    assert sims.shape == (20, 7)
+    for i in range(len(live)):
+        for j in range(len(refs)):
+            expected = pose_logic.calculate_similarity(live[i], refs[j])
+            assert abs(sims[i, j] - expected) < 1e-6
+
+def test_check_pose_batch_matches_scalar():
+    rng = np.random.default_rng(2)
+    live, _, _ = pose_logic.normalize_keypoints_batch(random_keypoints(rng, 50))
+    refs, _, _ = pose_logic.normalize_keypoints_batch(random_keypoints(rng, 10))
+    ref_list = list(refs)
+    is_match, scores, best_idx = pose_logic.check_pose_batch(live, ref_list, threshold=0.5)
+
+    for i in range(len(live)):
+        exp_match, exp_score, exp_idx = pose_logic.check_pose_direct(live[i], ref_list, threshold=0.5)
+        assert is_match[i] == exp_match
+        assert abs(scores[i] - exp_score) < 1e-6
+        assert best_idx[i] == exp_idx
+
+def test_check_pose_batch_without_references():
+    live = np.ones((3, 24))
+    is_match, scores, best_idx = pose_logic.check_pose_batch(live, [], threshold=0.5)
+    assert not is_match.any()
+    assert (scores == 0).all()
+    assert (best_idx == -1).all()
+
+def test_keypoints_json_round_trip():
+    rng = np.random.default_rng(3)
+    kpts = random_keypoints(rng, 1)[0]
+    text = pose_logic.keypoints_to_json(kpts, (800, 600, 3))
+    restored, size = pose_logic.keypoints_from_json(text)
+    assert size == (800, 600)
+    np.testing.assert_allclose(restored, kpts, atol=0.01)
+
+    # "No pose" marker and legacy rows without keypoints
+    assert pose_logic.keypoints_from_json(pose_logic.keypoints_to_json(None, (800, 600, 3))) == (None, None)
+    assert pose_logic.keypoints_from_json(None) == (None, None)
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import numpy as np
+import pytest
+import imaging
+import loadtest
+import pose_logic
+import sessions
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(pose_logic, "model", loadtest.StubPoseModel())
+    manager = sessions.SessionManager({}, {}, str(tmp_path))
+    yield manager
+    for name in list(manager.sessions):
+        manager.remove(name)
+
+def looping_source():
+    frames = [np.full((480, 640, 3), i * 50, np.uint8) for i in range(4)]
+    return lambda: loadtest.LoopingImageSource(frames)
+
+def test_pool_serves_waiters_in_arrival_order(manager):
+    pool = manager.pool
+    order = []
+
+    def worker(name):
+        with pool.acquire():
+            order.append(name)
+
+    threads = []
+    with pool.acquire():
+        for name in ["a", "b", "c", "d"]:
+            thread = threading.Thread(target=worker, args=(name,))
+            thread.start()
+            threads.append(thread)
+            # Queue the next one only after this one is waiting
+            while len(pool._waiting) < len(threads):
+                time.sleep(0.001)
+    for thread in threads:
+        thread.join(2)
+    assert order == ["a", "b", "c", "d"]
+
+def test_sessions_keep_separate_state(manager):
+    a = manager.create("a")
+    b = manager.create("b")
+    b.verification["progress"] = 60
+    a.set_movement(sessions.MOVEMENTS[1])
+
+    assert a.current_movement == sessions.MOVEMENTS[1]
+    assert b.current_movement == sessions.MOVEMENTS[0]
+    assert a.verification is not b.verification
+    assert b.verification["progress"] == 60
+    assert a.status()["session"] == "a" and b.status()["session"] == "b"
+    with pytest.raises(ValueError):
+        manager.create("a")
+
+def test_idle_session_stops_and_restarts_with_fresh_frames(manager, monkeypatch):
+    monkeypatch.setattr(sessions, "IDLE_TIMEOUT", 0.3)
+    session = manager.create("loop", looping_source(), max_fps=30)
+
+    assert session.capture_frame() is not None
+    session.thread.join(3)
+    assert not session.thread.is_alive()
+    assert session.latest_frame is None and session.latest_jpeg is None
+
+    # The frame from before the idle period is never handed out again
+    frame_id = session.frame_id
+    assert session.capture_frame() is not None
+    assert session.frame_id > frame_id
+    assert session.thread.is_alive()
+
+def test_process_frame_scores_match_scalar_check(manager, monkeypatch):
+    monkeypatch.setattr(pose_logic, "load_config_threshold", lambda: 0.9)
+    rng = np.random.default_rng(4)
+    live = rng.normal(size=24)
+    for i, mov in enumerate(sessions.MOVEMENTS):
+        manager.references[mov] = list(rng.normal(size=(3 + i, 24)))
+        manager.ref_filenames[mov] = [f"{mov}_{j}.jpg" for j in range(3 + i)]
+    # Target equal to one reference: must match, with that reference as best
+    target = sessions.MOVEMENTS[1]
+    manager.references[target][2] = live.copy()
+
+    session = manager.create("score")
+    session.set_movement(target)
+    session.process_frame(np.zeros((480, 640, 3), np.uint8), live, None, None)
+    for mov in sessions.MOVEMENTS:
+        _, expected, _ = pose_logic.check_pose_direct(live, manager.references[mov], threshold=0.0)
+        assert abs(session.scores[mov] - expected) < 1e-9
+    assert session.detected_movement == target
+    assert session.verification["last_status"].startswith("Holding")
+
+    # Replacing a movement's references rebuilds the cached matrix
+    manager.references[target] = []
+    session.process_frame(np.zeros((480, 640, 3), np.uint8), live, None, None)
+    assert session.scores[target] == 0.0
+    assert session.verification["progress"] == 0
+
+# --- Pre-fork mode: two managers in one process stand in for two workers ---
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(pose_logic, "model", loadtest.StubPoseModel())
+    managers = []
+    for _ in range(2):
+        manager = sessions.SessionManager({}, {}, str(tmp_path))
+        manager.create(sessions.DEFAULT_SESSION, looping_source(), max_fps=30)
+        managers.append(manager)
+    for manager in managers:
+        # flock conflicts between separate open() calls, even in one process
+        manager.enable_shared_capture(str(tmp_path / "runtime"))
+    assert wait_until(lambda: any(m.is_owner for m in managers))
+    yield sorted(managers, key=lambda m: not m.is_owner)
+    for manager in managers:
+        manager.remove(sessions.DEFAULT_SESSION)
+
+def test_exactly_one_worker_owns_capture(workers):
+    time.sleep(0.3)
+    owner, mirror = workers
+    assert owner.is_owner and not mirror.is_owner
+    assert mirror.get(sessions.DEFAULT_SESSION).is_mirror()
+
+def test_movement_is_shared_through_control_file(workers):
+    owner, mirror = [m.get(sessions.DEFAULT_SESSION) for m in workers]
+    target = sessions.MOVEMENTS[1]
+    mirror.set_movement(target)
+    # No capture is running, each worker answers from the control file
+    assert owner.current_movement == target
+    assert owner.status()["movement"] == target
+    owner.set_movement(sessions.MOVEMENTS[0])
+    assert mirror.current_movement == sessions.MOVEMENTS[0]
+    assert mirror.status()["movement"] == sessions.MOVEMENTS[0]
+
+def test_mirror_follows_capture_process(workers):
+    owner, mirror = [m.get(sessions.DEFAULT_SESSION) for m in workers]
+    assert mirror.capture_frame() is not None
+    assert owner.thread.is_alive() # Started by the mirror's demand
+
+    viewer = mirror.generate_frames()
+    assert next(viewer).startswith(b'--frame')
+    # Both workers report the same live state and viewer count
+    assert wait_until(lambda: mirror.status()["viewers"] == 1 and owner.status()["viewers"] == 1)
+    assert mirror.status()["status"].startswith("Incorrect Pose")
+    assert mirror.status()["fps"] > 0
+    viewer.close()
+
+def test_stale_shared_files_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(pose_logic, "model", loadtest.StubPoseModel())
+    manager = sessions.SessionManager({}, {}, str(tmp_path))
+    manager.shared_dir = str(tmp_path)
+    manager.is_owner = False
+    session = manager.create("old")
+    # Left over from an earlier server run
+    sessions.write_atomic(session.shared_path('.json'), b'{"status": "VERIFIED!", "frame_id": 9, "time": 0}')
+    sessions.write_atomic(session.shared_path('.jpg'), b'jpeg')
+    sessions.write_atomic(session.shared_path('.raw.jpg'), imaging.encode_jpeg(np.zeros((48, 64, 3), np.uint8)))
+    old = time.time() - 60
+    os.utime(session.shared_path('.raw.jpg'), (old, old))
+
+    assert session.read_shared_status() is None
+    assert session.status()["status"] == "Waiting..."
+    assert session.read_shared_frame() is None
+    assert session.capture_frame(timeout=0.5) is None
+    assert session.latest_jpeg is None
+
+def test_write_atomic_from_many_threads(tmp_path):
+    path = str(tmp_path / "control.json")
+    errors = []
+
+    def writer(i):
+        try:
+            for _ in range(50):
+                sessions.write_atomic(path, str(i).encode())
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,8 @@
+"""
+Production entry point for a pre-fork WSGI server, see gunicorn.conf.py:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app
+
+__all__ = ['app']